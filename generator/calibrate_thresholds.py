@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Calibrate DIFFICULTY_CONFIG's min_gap and min_complexity thresholds.
+
+For each difficulty, sample layouts the way the generator does, exact-solve
+them and report the distribution of the median ensemble heuristic gap and of
+the optimal route's complexity, with the acceptance rate at the current
+thresholds. The single NN + 2-opt gap (the original difficulty proxy) is
+reported alongside for comparison. Layout sampling, distance matrices,
+complexities and the NN + 2-opt tours use the batched helpers; only the exact
+solve and the ensemble run per layout.
+
+Usage:
+  python generator/calibrate_thresholds.py [--difficulty NAME[,NAME...]|all] [--samples N]
+                                           [--acceptance RATE] [--seed N]
+
+  --difficulty   difficulties to calibrate (default: all)
+  --samples N    layouts sampled per difficulty (default: 600)
+  --acceptance   suggest thresholds that accept this fraction of layouts on
+                 each criterion (default: report the current rates only)
+  --seed N       seed the layout sampler for a reproducible run
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from generate_puzzle import (
+    DIFFICULTY_CONFIG,
+    GRID_SIZE,
+    generate_coordinate_batch,
+    houses_from_coordinates,
+    layout_distance_matrices,
+    meets_thresholds,
+    route_complexities,
+    solve_tsp_exact,
+)
+from heuristics import heuristic_ensemble, nearest_neighbor_with_two_opt_batch
+
+QUANTILES = (0.5, 0.75, 0.9, 0.95, 0.97)
+
+
+def sample_stats(difficulty, samples, rng):
+    """Per-layout gaps and complexities for samples layouts of one difficulty."""
+    cfg = DIFFICULTY_CONFIG[difficulty]
+    north_pole = {"x": GRID_SIZE // 2, "y": GRID_SIZE // 2}
+    num_houses = max(cfg["house_range"])
+    layouts = generate_coordinate_batch(
+        samples,
+        num_houses,
+        north_pole=north_pole,
+        min_grid_distance=cfg["min_grid_distance"],
+        biased=cfg["biased"],
+        rng=rng,
+    )
+    distance_matrices = layout_distance_matrices(north_pole, layouts)
+    node_coords = np.concatenate([np.tile([[north_pole["x"], north_pole["y"]]], (samples, 1, 1)), layouts], axis=1)
+
+    optimal = np.zeros(samples)
+    routes = np.zeros((samples, num_houses + 2, 2))
+    ensemble_gaps = np.zeros(samples)
+    for row, coords in enumerate(layouts):
+        houses = houses_from_coordinates(coords)
+        optimal[row], permutation, _, _ = solve_tsp_exact(north_pole, houses, backend=cfg["solver"])
+        routes[row] = node_coords[row, list(permutation) + [0]]
+        lengths = [length for _, length in heuristic_ensemble(distance_matrices[row], node_coords[row]).values()]
+        ensemble_gaps[row] = np.median(np.maximum(0.0, (np.array(lengths) - optimal[row]) / optimal[row]))
+
+    _, baseline_lengths = nearest_neighbor_with_two_opt_batch(distance_matrices)
+    return {
+        "heuristic_gap": ensemble_gaps,
+        "nearest_neighbor_2opt_gap": np.maximum(0.0, (baseline_lengths - optimal) / optimal),
+        "complexity": route_complexities(routes),
+    }
+
+
+def describe(name, values):
+    quantiles = ", ".join(f"p{round(q * 100)}={np.quantile(values, q):.3f}" for q in QUANTILES)
+    print(f"  {name:<26} mean={values.mean():.3f}, {quantiles}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report gap/complexity distributions to calibrate thresholds.")
+    parser.add_argument("--difficulty", default="all", help="comma-separated difficulties, or all (default: all)")
+    parser.add_argument("--samples", type=int, default=600, help="layouts per difficulty (default: 600)")
+    parser.add_argument("--acceptance", type=float, help="target fraction of layouts passing each threshold")
+    parser.add_argument("--seed", type=int, help="seed for the layout sampler")
+    args = parser.parse_args()
+
+    difficulties = list(DIFFICULTY_CONFIG) if args.difficulty == "all" else args.difficulty.split(",")
+    unknown = [name for name in difficulties if name not in DIFFICULTY_CONFIG]
+    if unknown:
+        parser.error(f"Unknown difficulty: {', '.join(unknown)}. Use: {', '.join(DIFFICULTY_CONFIG)} or all")
+    if args.acceptance is not None and not 0 < args.acceptance <= 1:
+        parser.error("--acceptance must be in (0, 1]")
+    rng = np.random.default_rng(args.seed)
+
+    for difficulty in difficulties:
+        cfg = DIFFICULTY_CONFIG[difficulty]
+        start = time.perf_counter()
+        stats = sample_stats(difficulty, args.samples, rng)
+        gaps, complexities = stats["heuristic_gap"], stats["complexity"]
+
+        print(f"[{difficulty}] {args.samples} layouts of {max(cfg['house_range'])} houses "
+              f"in {time.perf_counter() - start:.1f}s")
+        for name, values in stats.items():
+            describe(name, values)
+
+        gap_rate = (gaps >= cfg["min_gap"]).mean()
+        complexity_rate = (complexities >= cfg["min_complexity"]).mean()
+        accepted = np.mean([
+            meets_thresholds({"heuristic_gap": gap, "complexity": complexity}, cfg)
+            for gap, complexity in zip(gaps, complexities)
+        ])
+        print(f"  current: min_gap={cfg['min_gap']} passes {gap_rate:.1%}, "
+              f"min_complexity={cfg['min_complexity']} passes {complexity_rate:.1%}, both {accepted:.1%}")
+
+        if args.acceptance is not None:
+            print(f"  suggested for {args.acceptance:.1%} each: "
+                  f"min_gap={np.quantile(gaps, 1 - args.acceptance):.3f}, "
+                  f"min_complexity={np.quantile(complexities, 1 - args.acceptance):.0f}")
+
+
+if __name__ == '__main__':
+    main()
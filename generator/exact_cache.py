@@ -0,0 +1,81 @@
+"""
+Persistent cache of exact TSP results.
+
+Layouts are keyed canonically: house offsets from the north pole, taken under
+whichever of the 8 grid symmetries (rotations/reflections about the pole)
+sorts smallest. Symmetric layouts share one entry, and the stored permutation
+is mapped back through the symmetry on lookup. Distances are invariant under
+these symmetries, so a hit returns exactly what the solver would.
+"""
+
+import json
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / "exact_cache.sqlite"
+
+SYMMETRIES = (
+    lambda dx, dy: (dx, dy),
+    lambda dx, dy: (-dy, dx),
+    lambda dx, dy: (-dx, -dy),
+    lambda dx, dy: (dy, -dx),
+    lambda dx, dy: (-dx, dy),
+    lambda dx, dy: (dx, -dy),
+    lambda dx, dy: (dy, dx),
+    lambda dx, dy: (-dy, -dx),
+)
+
+
+def canonical_layout(north_pole, houses):
+    """
+    Canonical key for a layout and the house order behind it: order[k] is the
+    index into houses of canonical house k (node k + 1 in the stored permutation).
+    """
+    offsets = [(h["x"] - north_pole["x"], h["y"] - north_pole["y"]) for h in houses]
+    best = None
+    for transform in SYMMETRIES:
+        moved = [transform(dx, dy) for dx, dy in offsets]
+        order = sorted(range(len(moved)), key=moved.__getitem__)
+        key = [moved[i] for i in order]
+        if best is None or key < best[0]:
+            best = (key, order)
+    key, order = best
+    return ";".join(f"{dx},{dy}" for dx, dy in key), order
+
+
+def _connect(path):
+    connection = sqlite3.connect(str(path), timeout=30)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS exact_results ("
+        "layout TEXT PRIMARY KEY, optimal_distance REAL NOT NULL, "
+        "permutation TEXT NOT NULL, solver TEXT NOT NULL)"
+    )
+    return connection
+
+
+def lookup_exact(path, north_pole, houses):
+    """Cached (permutation, distance, solver) for this layout, or None."""
+    if not Path(path).exists():
+        return None
+    key, order = canonical_layout(north_pole, houses)
+    with closing(_connect(path)) as connection:
+        row = connection.execute(
+            "SELECT optimal_distance, permutation, solver FROM exact_results WHERE layout = ?", (key,)
+        ).fetchone()
+    if row is None:
+        return None
+    distance, canonical, solver = row
+    permutation = [0] + [order[node - 1] + 1 for node in json.loads(canonical)[1:]]
+    return permutation, distance, solver
+
+
+def store_exact(path, north_pole, houses, permutation, distance, solver):
+    key, order = canonical_layout(north_pole, houses)
+    rank = {house: k for k, house in enumerate(order)}
+    canonical = [0] + [rank[int(node) - 1] + 1 for node in permutation[1:]]
+    with closing(_connect(path)) as connection, connection:
+        connection.execute(
+            "INSERT OR IGNORE INTO exact_results VALUES (?, ?, ?, ?)",
+            (key, float(distance), json.dumps(canonical), solver),
+        )
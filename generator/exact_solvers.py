@@ -0,0 +1,789 @@
+"""
+Exact TSP solvers used by the puzzle generator.
+
+All solvers take a square distance matrix (node 0 is the north pole) and return
+(permutation, distance) like python_tsp: the permutation starts at node 0 and
+does not repeat it at the end.
+
+Solvers are registered by name in EXACT_SOLVERS; run_exact_solver runs one by
+name and records its wall time (and, on request, its peak memory).
+"""
+
+import math
+import multiprocessing
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from heuristics import walk_cycle
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+EXACT_SOLVERS = {}
+CROSS_CHECK_TOLERANCE = 1e-6
+DENSE_HELD_KARP_MAX_NODES = 17  # above this, use held_karp_streamed to bound memory
+_BOUND_TOLERANCE = 1e-7  # slack when comparing lower bounds with tour lengths
+BRANCH_AND_BOUND_TIME_LIMIT = 2.0  # seconds; the ILP is faster on the layouts that take longer
+
+
+class SearchLimitExceeded(RuntimeError):
+    """A solver hit its search limit before proving optimality."""
+
+
+def register_exact_solver(
+    name, max_nodes=None, uses_initial_tour=False, uses_candidate_edges=False, fallback=None
+):
+    """
+    Register a solver under name; max_nodes caps the instances it accepts.
+    Solvers flagged uses_candidate_edges restrict themselves to the edges
+    allowed by a candidate_edges matrix when one is given. If the solver
+    raises SearchLimitExceeded, run_exact_solver re-solves with fallback;
+    such solvers take a time_limit keyword, which None disables.
+    """
+    def decorator(func):
+        EXACT_SOLVERS[name] = {
+            "solve": func,
+            "max_nodes": max_nodes,
+            "uses_initial_tour": uses_initial_tour,
+            "uses_candidate_edges": uses_candidate_edges,
+            "fallback": fallback,
+        }
+        return func
+    return decorator
+
+
+def _trivial_tour(dist):
+    n = dist.shape[0]
+    if n == 0:
+        return [], 0.0
+    if n == 1:
+        return [0], 0.0
+    return [0, 1], float(dist[0, 1] + dist[1, 0])
+
+
+def _tour_length(dist, permutation):
+    tour = list(permutation) + [permutation[0]]
+    return float(sum(dist[tour[i], tour[i + 1]] for i in range(len(tour) - 1)))
+
+
+def _popcounts(num_masks, num_bits):
+    masks = np.arange(num_masks)
+    counts = np.zeros(num_masks, dtype=np.int8)
+    for b in range(num_bits):
+        counts += ((masks >> b) & 1).astype(np.int8)
+    return counts
+
+
+@register_exact_solver("held_karp", max_nodes=DENSE_HELD_KARP_MAX_NODES)
+def solve_tsp_held_karp(distance_matrix):
+    """
+    Bitmask Held-Karp DP with the cost table held as a (subset, last node) array.
+
+    Subsets exclude node 0 and are relaxed one cardinality layer at a time with
+    vectorized min/argmin over the predecessor node.
+    """
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    if n <= 2:
+        return _trivial_tour(dist)
+
+    m = n - 1
+    full = 1 << m
+    inner = dist[1:, 1:]
+    bits = 1 << np.arange(m)
+
+    cost = np.full((full, m), np.inf)
+    parent = np.full((full, m), -1, dtype=np.int8)
+    cost[bits, np.arange(m)] = dist[0, 1:]
+
+    masks = np.arange(full)
+    counts = _popcounts(full, m)
+    for size in range(2, m + 1):
+        layer = masks[counts == size]
+        for j in range(m):
+            subsets = layer[(layer & bits[j]) != 0]
+            # cost[prev, i] is inf whenever i is not in prev, so invalid moves never win
+            candidates = cost[subsets ^ bits[j]] + inner[:, j]
+            best = np.argmin(candidates, axis=1)
+            cost[subsets, j] = candidates[np.arange(len(subsets)), best]
+            parent[subsets, j] = best
+
+    closing = cost[full - 1] + dist[1:, 0]
+    last = int(np.argmin(closing))
+    distance = float(closing[last])
+
+    route = []
+    mask = full - 1
+    node = last
+    while node >= 0:
+        route.append(node + 1)
+        prev = int(parent[mask, node])
+        mask ^= 1 << node
+        node = prev
+    return [0] + route[::-1], distance
+
+
+def _colex_ranks(masks, num_bits, binom):
+    """Rank each k-subset bitmask among all k-subsets in increasing mask order."""
+    masks = np.asarray(masks, dtype=np.int64)
+    ranks = np.zeros(masks.shape, dtype=np.int64)
+    seen = np.zeros(masks.shape, dtype=np.int64)
+    for b in range(num_bits):
+        bit = (masks >> b) & 1
+        seen += bit
+        ranks += bit * binom[b, seen]
+    return ranks
+
+
+@register_exact_solver("held_karp_streamed", max_nodes=23)
+def solve_tsp_held_karp_streamed(distance_matrix, spill_dir=None):
+    """
+    Held-Karp that streams subsets by cardinality to bound memory.
+
+    Only the previous and current cost layers are kept in memory; each layer is
+    indexed by the subset's colex rank. Back-pointers are stored as one uint8
+    per (subset, last node) state and, when spill_dir is given, live in a
+    memory-mapped file there instead of RAM.
+    """
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    if n <= 2:
+        return _trivial_tour(dist)
+
+    m = n - 1
+    if m > 255:
+        raise ValueError(f"Too many nodes ({n}) for uint8 back-pointers.")
+    full = 1 << m
+    inner = dist[1:, 1:]
+    bits = 1 << np.arange(m, dtype=np.int64)
+    binom = np.array([[math.comb(p, t) for t in range(m + 1)] for p in range(m + 1)], dtype=np.int64)
+    layer_sizes = [math.comb(m, k) for k in range(m + 1)]
+    offsets = np.concatenate(([0], np.cumsum(layer_sizes))) * m
+
+    spill_file = None
+    if spill_dir is not None:
+        spill_file = tempfile.NamedTemporaryFile(dir=spill_dir, prefix="held_karp_", suffix=".bin")
+        parents = np.memmap(spill_file, dtype=np.uint8, mode="w+", shape=(int(offsets[-1]),))
+    else:
+        parents = np.empty(int(offsets[-1]), dtype=np.uint8)
+
+    def parent_layer(size):
+        return parents[offsets[size]:offsets[size + 1]].reshape(layer_sizes[size], m)
+
+    try:
+        counts = _popcounts(full, m)
+        # Layer 1: the colex rank of {j} is j
+        prev_cost = np.full((m, m), np.inf)
+        prev_cost[np.arange(m), np.arange(m)] = dist[0, 1:]
+
+        for size in range(2, m + 1):
+            layer = np.flatnonzero(counts == size)
+            cost = np.full((len(layer), m), np.inf)
+            back = parent_layer(size)
+            for j in range(m):
+                rows = np.flatnonzero(layer & bits[j])
+                prev_rows = _colex_ranks(layer[rows] ^ bits[j], m, binom)
+                candidates = prev_cost[prev_rows] + inner[:, j]
+                best = np.argmin(candidates, axis=1)
+                cost[rows, j] = candidates[np.arange(len(rows)), best]
+                back[rows, j] = best
+            prev_cost = cost
+
+        closing = prev_cost[0] + dist[1:, 0]
+        last = int(np.argmin(closing))
+        distance = float(closing[last])
+
+        route = [last + 1]
+        mask = full - 1
+        node = last
+        for size in range(m, 1, -1):
+            row = int(_colex_ranks([mask], m, binom)[0])
+            prev = int(parent_layer(size)[row, node])
+            mask ^= 1 << node
+            node = prev
+            route.append(node + 1)
+    finally:
+        del parents
+        if spill_file is not None:
+            spill_file.close()
+
+    return [0] + route[::-1], distance
+
+
+def _subset_spanning_trees(inner, masks):
+    """MST weight over the nodes of each bitmask (bit b is node b + 1), by batched Prim."""
+    m = inner.shape[0]
+    rows = np.arange(len(masks))
+    member = ((masks[:, None] >> np.arange(m)) & 1).astype(bool)
+    start = np.argmax(member, axis=1)
+    in_tree = np.zeros_like(member)
+    in_tree[rows, start] = True
+    key = inner[start].copy()
+    total = np.zeros(len(masks))
+    for _ in range(int(member.sum(axis=1).max(initial=1)) - 1):
+        candidates = np.where(member & ~in_tree, key, np.inf)
+        v = np.argmin(candidates, axis=1)
+        weight = candidates[rows, v]
+        grown = np.isfinite(weight)
+        # Members left that no finite edge reaches: the subset cannot be spanned
+        total[~grown & (member & ~in_tree).any(axis=1)] = np.inf
+        total[grown] += weight[grown]
+        in_tree[rows[grown], v[grown]] = True
+        key[grown] = np.minimum(key[grown], inner[v[grown]])
+    return total
+
+
+@register_exact_solver("held_karp_pruned", max_nodes=23, uses_initial_tour=True, uses_candidate_edges=True)
+def solve_tsp_held_karp_pruned(distance_matrix, initial_tour=None, candidate_edges=None):
+    """
+    Sparse Held-Karp that keeps only states which can still beat an upper bound.
+
+    The bound is the length of initial_tour (e.g. the 2-opt tour). A path
+    state (visited, last) is dropped when its cost plus a lower bound on
+    finishing the tour (MST of the unvisited nodes plus the cheapest edges
+    joining them to the path end and to node 0) exceeds it.
+    """
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    if n <= 2:
+        return _trivial_tour(dist)
+
+    if initial_tour is None:
+        initial_tour = list(range(n))
+    upper_bound = _tour_length(dist, list(initial_tour)[:n])
+    limit = upper_bound + _BOUND_TOLERANCE * max(1.0, upper_bound)
+    if candidate_edges is not None:
+        # Eliminated edges cost inf, so paths through them are pruned like any other
+        dist = np.where(candidate_edges, dist, np.inf)
+
+    m = n - 1
+    full = (1 << m) - 1
+    inner = dist[1:, 1:]
+    to_pole = dist[1:, 0]
+    bits = 1 << np.arange(m, dtype=np.int64)
+
+    def completion_bounds(masks, last):
+        unvisited = full ^ masks
+        bounds = to_pole[last].copy()
+        open_rows = np.flatnonzero(unvisited)
+        if len(open_rows):
+            unique, inverse = np.unique(unvisited[open_rows], return_inverse=True)
+            member = ((unvisited[open_rows, None] >> np.arange(m)) & 1).astype(bool)
+            enter = np.where(member, inner[last[open_rows]], np.inf).min(axis=1)
+            leave = np.where(member, to_pole, np.inf).min(axis=1)
+            bounds[open_rows] = _subset_spanning_trees(inner, unique)[inverse.ravel()] + enter + leave
+        return bounds
+
+    masks = bits.copy()
+    last = np.arange(m)
+    cost = dist[0, 1:].copy()
+    keep = cost + completion_bounds(masks, last) <= limit
+    masks, last, cost = masks[keep], last[keep], cost[keep]
+    layers = [(last, None)]
+
+    for _ in range(2, m + 1):
+        prev_index, nxt = np.nonzero(((masks[:, None] & bits[None, :]) == 0) & np.isfinite(inner[last]))
+        new_masks = masks[prev_index] | bits[nxt]
+        new_cost = cost[prev_index] + inner[last[prev_index], nxt]
+
+        # One state per (subset, last node): the cheapest path into it
+        order = np.lexsort((new_cost, new_masks * m + nxt))
+        state = (new_masks * m + nxt)[order]
+        first = np.concatenate(([True], state[1:] != state[:-1]))
+        chosen = order[first]
+        masks, last, cost, parent = new_masks[chosen], nxt[chosen], new_cost[chosen], prev_index[chosen]
+
+        keep = cost + completion_bounds(masks, last) <= limit
+        masks, last, cost, parent = masks[keep], last[keep], cost[keep], parent[keep]
+        layers.append((last, parent))
+
+    closing = cost + to_pole[last]
+    index = int(np.argmin(closing))
+    distance = float(closing[index])
+
+    route = []
+    for layer_last, layer_parent in reversed(layers):
+        route.append(int(layer_last[index]) + 1)
+        if layer_parent is not None:
+            index = int(layer_parent[index])
+    return [0] + route[::-1], distance
+
+
+_FREE, _INCLUDED, _EXCLUDED = 0, 1, -1
+
+
+def _min_one_tree(weights, status):
+    """
+    Minimum 1-tree on weights honouring status: an MST over nodes 1..n-1 plus
+    the two cheapest edges at node 0. Included edges are taken first, excluded
+    edges never. Returns (edges, degree) or None if no 1-tree exists.
+    """
+    n = weights.shape[0]
+    included = status == _INCLUDED
+    # Selection keys: any included edge beats every free edge
+    keys = np.where(status == _EXCLUDED, np.inf, weights)
+    keys = np.where(included, -np.inf, keys)
+
+    rows = []
+    cols = []
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = in_tree[1] = True
+    best = keys[1].copy()
+    parent = np.ones(n, dtype=int)
+    for _ in range(n - 2):
+        v = int(np.argmin(np.where(in_tree, np.inf, best)))
+        if best[v] == np.inf:
+            return None
+        rows.append(parent[v])
+        cols.append(v)
+        in_tree[v] = True
+        closer = keys[v] < best
+        best = np.where(closer, keys[v], best)
+        parent = np.where(closer, v, parent)
+
+    root_keys = keys[0].copy()
+    root_keys[0] = np.inf
+    pair = np.argsort(root_keys, kind="stable")[:2]
+    if root_keys[pair[1]] == np.inf:
+        return None
+    rows.extend([0, 0])
+    cols.extend(int(v) for v in pair)
+
+    edges = (np.array(rows), np.array(cols))
+    degree = np.bincount(np.concatenate(edges), minlength=n)
+    return edges, degree
+
+
+def _one_tree_to_tour(edges, n):
+    neighbours = [[] for _ in range(n)]
+    for a, b in zip(*edges):
+        neighbours[a].append(int(b))
+        neighbours[b].append(int(a))
+    return walk_cycle(neighbours)
+
+
+def _ascent(dist, status, pi, upper_bound, iterations):
+    """
+    Subgradient ascent on the Lagrangian 1-tree bound.
+
+    Returns (bound, pi, edges, degree), or None if the node is infeasible. When
+    the best 1-tree is already a tour, every degree in the result is 2.
+    """
+    best = None
+    scale = 2.0
+    stalled = 0
+    for _ in range(iterations):
+        weights = dist + pi[:, None] + pi[None, :]
+        tree = _min_one_tree(weights, status)
+        if tree is None:
+            return None
+        edges, degree = tree
+        bound = float(weights[edges].sum() - 2.0 * pi.sum())
+        if best is None or bound > best[0] + 1e-12:
+            best = (bound, pi.copy(), edges, degree)
+            stalled = 0
+        else:
+            stalled += 1
+            if stalled >= 5:
+                scale /= 2.0
+                stalled = 0
+
+        subgradient = degree - 2
+        norm = float(subgradient @ subgradient)
+        if norm == 0 or bound >= upper_bound - _BOUND_TOLERANCE:
+            return bound, pi, edges, degree
+        gap = upper_bound - bound if np.isfinite(upper_bound) else abs(bound) * 0.1 + 1.0
+        pi = pi + scale * gap / norm * subgradient
+    return best
+
+
+def one_tree_lower_bound(distance_matrix, upper_bound=None, iterations=50):
+    """Held-Karp (Lagrangian 1-tree) lower bound on the optimal tour length."""
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    if n <= 3:
+        return solve_tsp_held_karp(dist)[1]
+    status = np.zeros((n, n), dtype=np.int8)
+    np.fill_diagonal(status, _EXCLUDED)
+    if upper_bound is None:
+        upper_bound = np.inf
+    bound, _, _, _ = _ascent(dist, status, np.zeros(n), upper_bound, iterations)
+    return bound
+
+
+def candidate_edges(distance_matrix, upper_bound, iterations=100):
+    """
+    Edges that may lie on an optimal tour, as a symmetric boolean matrix.
+
+    upper_bound is the length of any known tour. After subgradient ascent on
+    the 1-tree bound, an edge is eliminated when forcing it into the 1-tree
+    (swapping out the heaviest tree edge it would replace) raises the bound
+    above upper_bound: every tour through it is then longer than a known one.
+    """
+    return edge_elimination(distance_matrix, upper_bound, iterations)[1]
+
+
+def edge_elimination(distance_matrix, upper_bound, iterations=100):
+    """
+    candidate_edges() together with the 1-tree lower bound its ascent reached,
+    for callers that need both: returns (lower_bound, allowed).
+    """
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    allowed = ~np.eye(n, dtype=bool)
+    if n <= 4:
+        return one_tree_lower_bound(dist, upper_bound), allowed
+
+    status = np.zeros((n, n), dtype=np.int8)
+    np.fill_diagonal(status, _EXCLUDED)
+    bound, pi, edges, _ = _ascent(dist, status, np.zeros(n), upper_bound, iterations)
+    weights = dist + pi[:, None] + pi[None, :]
+
+    # Heaviest edge on the spanning-tree path between each pair of nodes 1..n-1
+    neighbours = [[] for _ in range(n)]
+    for a, b in zip(edges[0][:-2].tolist(), edges[1][:-2].tolist()):
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+    path_max = np.zeros((n, n))
+    for source in range(1, n):
+        stack = [source]
+        seen = {source}
+        while stack:
+            node = stack.pop()
+            for other in neighbours[node]:
+                if other not in seen:
+                    seen.add(other)
+                    path_max[source, other] = max(path_max[source, node], weights[node, other])
+                    stack.append(other)
+
+    forced = bound + weights - path_max
+    root_swap = weights[0, edges[1][-2:]].max()
+    forced[0, 1:] = bound + weights[0, 1:] - root_swap
+    forced[1:, 0] = forced[0, 1:]
+    allowed &= forced <= upper_bound + _BOUND_TOLERANCE * max(1.0, upper_bound)
+    return bound, allowed
+
+
+def _propagate(status):
+    """Apply degree and subtour implications in place; False if infeasible."""
+    n = status.shape[0]
+    changed = True
+    while changed:
+        changed = False
+        included = (status == _INCLUDED).sum(axis=1)
+        free = (status == _FREE).sum(axis=1)
+        if (included > 2).any() or (included + free < 2).any():
+            return False
+
+        for v in np.flatnonzero((included == 2) & (free > 0)):
+            open_edges = status[v] == _FREE
+            status[v, open_edges] = _EXCLUDED
+            status[open_edges, v] = _EXCLUDED
+            changed = True
+        if changed:
+            continue
+        for v in np.flatnonzero((included + free == 2) & (free > 0)):
+            open_edges = status[v] == _FREE
+            status[v, open_edges] = _INCLUDED
+            status[open_edges, v] = _INCLUDED
+            changed = True
+        if changed:
+            continue
+
+        # Included edges form paths and cycles; forbid closing a short path into a cycle
+        seen = np.zeros(n, dtype=bool)
+        for start in np.flatnonzero(included == 1):
+            if seen[start]:
+                continue
+            prev, node, size = -1, start, 1
+            seen[start] = True
+            while True:
+                nxt = [int(u) for u in np.flatnonzero(status[node] == _INCLUDED) if u != prev]
+                if not nxt:
+                    break
+                prev, node = node, nxt[0]
+                seen[node] = True
+                size += 1
+            if size < n and status[start, node] == _FREE:
+                status[start, node] = status[node, start] = _EXCLUDED
+                changed = True
+        cycle_nodes = int(((included == 2) & ~seen).sum())
+        if 0 < cycle_nodes < n:
+            return False
+    return True
+
+
+@register_exact_solver("branch_and_bound", uses_initial_tour=True, uses_candidate_edges=True, fallback="ilp")
+def solve_tsp_branch_and_bound(
+    distance_matrix,
+    initial_tour=None,
+    candidate_edges=None,
+    root_iterations=300,
+    node_iterations=40,
+    time_limit=BRANCH_AND_BOUND_TIME_LIMIT,
+):
+    """
+    Depth-first branch-and-bound with Held-Karp (Lagrangian 1-tree) lower bounds.
+
+    initial_tour seeds the incumbent (e.g. a heuristic tour); branching follows
+    Volgenant-Jonker on a node of degree > 2 in the best 1-tree. Edges outside
+    candidate_edges start out excluded. Raises SearchLimitExceeded after
+    time_limit seconds (None for no limit).
+    """
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    if n <= 3:
+        return solve_tsp_held_karp(dist)
+
+    if initial_tour is None:
+        initial_tour = list(range(n))
+    incumbent = list(initial_tour)
+    if len(incumbent) == n + 1 and incumbent[-1] == incumbent[0]:
+        incumbent = incumbent[:-1]
+    upper_bound = _tour_length(dist, incumbent)
+
+    status = np.zeros((n, n), dtype=np.int8)
+    np.fill_diagonal(status, _EXCLUDED)
+    if candidate_edges is not None:
+        status[~np.asarray(candidate_edges, dtype=bool)] = _EXCLUDED
+        if not _propagate(status):
+            raise ValueError("candidate_edges admit no tour")
+    stack = [(status, np.zeros(n), root_iterations)]
+
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    while stack:
+        if deadline is not None and time.perf_counter() > deadline:
+            raise SearchLimitExceeded(f"branch_and_bound did not finish within {time_limit}s")
+        status, pi, iterations = stack.pop()
+        result = _ascent(dist, status, pi, upper_bound, iterations)
+        if result is None:
+            continue
+        bound, pi, edges, degree = result
+        if (degree == 2).all():
+            length = _tour_length(dist, _one_tree_to_tour(edges, n))
+            if length < upper_bound - 1e-9:
+                upper_bound = length
+                incumbent = _one_tree_to_tour(edges, n)
+            continue
+        if bound >= upper_bound - _BOUND_TOLERANCE:
+            continue
+
+        # Branch on two free 1-tree edges at a node of degree > 2
+        tree_edges = set(zip(edges[0].tolist(), edges[1].tolist()))
+        weights = dist + pi[:, None] + pi[None, :]
+        candidates = np.flatnonzero(degree > 2)
+        v = int(candidates[np.argmax(degree[candidates])])
+        free = [u for u in range(n) if status[v, u] == _FREE and ((v, u) in tree_edges or (u, v) in tree_edges)]
+        free.sort(key=lambda u: weights[v, u], reverse=True)
+        first, second = free[0], free[1]
+
+        children = []
+        for fixes in (
+            [(first, _EXCLUDED)],
+            [(first, _INCLUDED), (second, _EXCLUDED)],
+            [(first, _INCLUDED), (second, _INCLUDED)],
+        ):
+            child = status.copy()
+            for u, value in fixes:
+                child[v, u] = child[u, v] = value
+            if _propagate(child):
+                children.append((child, pi.copy(), node_iterations))
+        stack.extend(reversed(children))
+
+    start = incumbent.index(0)
+    permutation = incumbent[start:] + incumbent[:start]
+    return [int(v) for v in permutation], _tour_length(dist, permutation)
+
+
+def _edge_components(n, rows, cols):
+    neighbours = [[] for _ in range(n)]
+    for a, b in zip(rows, cols):
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+    component = [-1] * n
+    components = []
+    for start in range(n):
+        if component[start] >= 0:
+            continue
+        members = [start]
+        component[start] = len(components)
+        for node in members:
+            for other in neighbours[node]:
+                if component[other] < 0:
+                    component[other] = len(components)
+                    members.append(other)
+        components.append(members)
+    return components, neighbours
+
+
+@register_exact_solver("ilp", uses_candidate_edges=True)
+def solve_tsp_ilp(distance_matrix, candidate_edges=None, max_rounds=200):
+    """
+    Exact solve as a symmetric 2-matching ILP with lazily added subtour cuts.
+
+    Uses scipy's bundled HiGHS MILP solver: solve the degree-2 relaxation, add
+    sum(x_e for e inside S) <= |S| - 1 for every subtour S found, and repeat.
+    Only edges in candidate_edges get a variable.
+    """
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    from scipy.sparse import coo_matrix, vstack
+
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    if n <= 3:
+        return solve_tsp_held_karp(dist)
+
+    rows, cols = np.triu_indices(n, k=1)
+    if candidate_edges is not None:
+        keep = np.asarray(candidate_edges, dtype=bool)[rows, cols]
+        rows, cols = rows[keep], cols[keep]
+    num_edges = len(rows)
+    costs = dist[rows, cols]
+    edge_ids = np.arange(num_edges)
+
+    degree = coo_matrix(
+        (np.ones(2 * num_edges), (np.concatenate([rows, cols]), np.concatenate([edge_ids, edge_ids]))),
+        shape=(n, num_edges),
+    ).tocsr()
+    cut_rows = []
+    cut_limits = []
+
+    for _ in range(max_rounds):
+        constraints = [LinearConstraint(degree, 2, 2)]
+        if cut_rows:
+            constraints.append(LinearConstraint(vstack(cut_rows).tocsr(), -np.inf, np.array(cut_limits)))
+        result = milp(
+            costs,
+            integrality=np.ones(num_edges),
+            bounds=Bounds(0, 1),
+            constraints=constraints,
+        )
+        if not result.success:
+            raise RuntimeError(f"ILP solver failed: {result.message}")
+
+        chosen = np.flatnonzero(result.x > 0.5)
+        components, neighbours = _edge_components(n, rows[chosen].tolist(), cols[chosen].tolist())
+        if len(components) == 1:
+            break
+        for members in components:
+            inside = np.zeros(n, dtype=bool)
+            inside[members] = True
+            cut = (inside[rows] & inside[cols]).astype(float)
+            cut_rows.append(coo_matrix(cut.reshape(1, -1)))
+            cut_limits.append(len(members) - 1)
+    else:
+        raise RuntimeError(f"ILP did not converge within {max_rounds} subtour-cut rounds.")
+
+    permutation = walk_cycle(neighbours)
+    return [int(v) for v in permutation], _tour_length(dist, permutation)
+
+
+@register_exact_solver("python_tsp_dp", max_nodes=17)
+def solve_tsp_python_tsp(distance_matrix):
+    """python_tsp's reference DP; slow, kept for cross-checking."""
+    from python_tsp.exact import solve_tsp_dynamic_programming
+
+    permutation, distance = solve_tsp_dynamic_programming(np.asarray(distance_matrix, dtype=float))
+    return [int(v) for v in permutation], float(distance)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _solve_peak_memory(name, distance_matrix, kwargs):
+    """Child-process task: repeat a solve and return its peak RSS growth in MB."""
+    before = _peak_rss_mb()
+    EXACT_SOLVERS[name]["solve"](distance_matrix, **kwargs)
+    return _peak_rss_mb() - before
+
+
+def measure_peak_memory(name, distance_matrix, kwargs):
+    """
+    Peak memory of one solve, including native allocations (HiGHS, NumPy),
+    as the growth of peak resident memory in a freshly forked process; the
+    parent's own high-water mark does not carry over into it.
+
+    Returns (peak_mb, None), or (None, reason) if it could not be measured.
+    """
+    if resource is None or "fork" not in multiprocessing.get_all_start_methods():
+        return None, "needs the resource module and fork"
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as pool:
+            return pool.submit(_solve_peak_memory, name, distance_matrix, kwargs).result(), None
+    except Exception as exc:
+        return None, f"{type(exc).__name__}: {exc}"
+
+
+def run_exact_solver(
+    name, distance_matrix, initial_tour=None, candidate_edges=None, trace_memory=False, fallback=True
+):
+    """
+    Solve with the named solver and measure it. candidate_edges (from
+    candidate_edges()) is passed to solvers that can restrict themselves to it.
+
+    Returns (permutation, distance, run) where run records the solver name and
+    wall time in seconds. With trace_memory the solve is repeated in a child
+    process (see measure_peak_memory), without any time limit so it cannot be
+    cut short, adding peak_memory_mb or, if that failed, peak_memory_skipped
+    with the reason. A solver that hits its search limit is replaced
+    by its registered fallback; run then names the fallback and records
+    fallback_from, and seconds includes the abandoned attempt. With
+    fallback=False such a solver runs without a time limit instead, so the
+    result really comes from the named solver (e.g. when cross-checking).
+    """
+    if name not in EXACT_SOLVERS:
+        raise ValueError(f"Unknown exact solver '{name}'. Use: {', '.join(EXACT_SOLVERS)}")
+    entry = EXACT_SOLVERS[name]
+    num_nodes = np.asarray(distance_matrix).shape[0]
+    if entry["max_nodes"] is not None and num_nodes > entry["max_nodes"]:
+        raise ValueError(f"Too many nodes ({num_nodes}) for {name}; limit is {entry['max_nodes']}.")
+
+    kwargs = {}
+    if entry["uses_initial_tour"]:
+        kwargs["initial_tour"] = initial_tour
+    if entry["uses_candidate_edges"] and candidate_edges is not None:
+        kwargs["candidate_edges"] = candidate_edges
+    if entry["fallback"] is not None and not fallback:
+        kwargs["time_limit"] = None
+    start = time.perf_counter()
+    try:
+        permutation, distance = entry["solve"](distance_matrix, **kwargs)
+    except SearchLimitExceeded:
+        if entry["fallback"] is None or not fallback:
+            raise
+        gave_up = time.perf_counter() - start
+        permutation, distance, run = run_exact_solver(
+            entry["fallback"], distance_matrix, initial_tour, candidate_edges, trace_memory
+        )
+        run.update(fallback_from=name, seconds=run["seconds"] + gave_up)
+        return permutation, distance, run
+    run = {"solver": name, "seconds": time.perf_counter() - start}
+
+    if trace_memory:
+        if entry["fallback"] is not None:
+            kwargs["time_limit"] = None
+        peak, skipped = measure_peak_memory(name, distance_matrix, kwargs)
+        if skipped:
+            run["peak_memory_skipped"] = skipped
+        else:
+            run["peak_memory_mb"] = peak
+    return permutation, float(distance), run
+
+
+def cross_check_exact(distance, other_distance, name, other_name):
+    """Raise if two exact solvers disagree on the optimal distance."""
+    tolerance = CROSS_CHECK_TOLERANCE * max(1.0, abs(distance))
+    if abs(distance - other_distance) > tolerance:
+        raise RuntimeError(
+            f"Exact solvers disagree: {name}={distance:.9f} vs {other_name}={other_distance:.9f}"
+        )
@@ -3,33 +3,55 @@
 Daily TSP puzzle generator (single entrypoint).
 
 Key rules:
-- Exact optimality only (dynamic programming); house count capped at <=16.
-- Difficulty uses candidate search with human-like heuristic gap + route complexity scoring.
+- Exact optimality only (Held-Karp DP up to 22 houses, 1-tree branch-and-bound beyond, with the ILP
+  taking over when branch-and-bound runs past its time limit); house count capped at <=40.
+- Difficulty uses candidate search with human-like heuristic gap (median over a heuristic
+  ensemble) + route complexity scoring;
+  the search stops at the first candidate that clears the thresholds or when its budget runs out.
 - Hard puzzles bias layouts (clusters/bottlenecks/outliers) to increase human difficulty.
 
 Usage:
-  python generator/generate_puzzle.py [YYYY-MM-DD]
+  python generator/generate_puzzle.py [YYYY-MM-DD] [difficulty] [--solver NAME] [--cross-check NAME] [--workers N] [--no-cache] [--trace-memory]
+  python generator/generate_puzzle.py [YYYY-MM-DD] [difficulty] --ahead N
+
+  --ahead N fills in any missing puzzles from the date through the N days after
+  it, in parallel, leaving existing files alone.
 
 Outputs:
   public/puzzles/YYYY/MM/DD_{difficulty}.json
   public/puzzles/YYYY/MM/DD_{difficulty}_solution.json
 """
 
+import argparse
+import functools
 import json
+import os
 import sys
 import math
 import random
-from datetime import datetime
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import numpy as np
-from python_tsp.exact import solve_tsp_dynamic_programming
+
+from exact_cache import DEFAULT_CACHE_PATH, lookup_exact, store_exact
+from exact_solvers import (
+    EXACT_SOLVERS,
+    candidate_edges,
+    cross_check_exact,
+    edge_elimination,
+    run_exact_solver,
+)
+from heuristics import heuristic_ensemble, nearest_neighbor_with_two_opt
 
 
 GRID_SIZE = 1000
 GRID_SPACING = 100
 MIN_MARGIN = GRID_SPACING  # keep emojis away from edges
-MAX_HOUSES = 16  # exact solver cap (17 nodes incl. north pole)
+MAX_HOUSES = 40  # exact solver cap (41 nodes incl. north pole)
+HELD_KARP_MAX_NODES = 23  # above this, use branch-and-bound
 
 
 def log(msg):
@@ -50,13 +72,9 @@ def build_valid_positions(grid_size=GRID_SIZE, grid_spacing=GRID_SPACING, margin
     return positions
 
 
-def is_far_enough(target, placed, min_grid_distance, grid_spacing):
-    for house in placed:
-        dx = abs(target[0] - house["x"]) // grid_spacing
-        dy = abs(target[1] - house["y"]) // grid_spacing
-        if max(dx, dy) < min_grid_distance:
-            return False
-    return True
+def lattice_cell(pos, grid_spacing=GRID_SPACING):
+    """Occupancy-grid cell for a lattice position (positions start one spacing in from the edge)."""
+    return pos[0] // grid_spacing - 1, pos[1] // grid_spacing - 1
 
 
 def generate_coordinates(num_houses, *, north_pole, min_grid_distance, biased=False):
@@ -64,12 +82,31 @@ def generate_coordinates(num_houses, *, north_pole, min_grid_distance, biased=Fa
     valid_positions = build_valid_positions(north_pole=north_pole)
     random.shuffle(valid_positions)
 
+    # True where a house may still go: unused, on the lattice and spaced from every placed house
+    cells = (GRID_SIZE - MIN_MARGIN) // GRID_SPACING
+    open_cells = np.zeros((cells, cells), dtype=bool)
+    for pos in valid_positions:
+        open_cells[lattice_cell(pos)] = True
+    reach = min_grid_distance - 1
+
     houses = []
 
+    def is_open(pos):
+        if pos[0] % GRID_SPACING or pos[1] % GRID_SPACING:
+            return False
+        i, j = lattice_cell(pos)
+        return 0 <= i < cells and 0 <= j < cells and open_cells[i, j]
+
+    def place(pos):
+        i, j = lattice_cell(pos)
+        open_cells[i, j] = False
+        if reach > 0:
+            open_cells[max(0, i - reach):i + reach + 1, max(0, j - reach):j + reach + 1] = False
+        houses.append({"id": len(houses) + 1, "x": pos[0], "y": pos[1]})
+
     def pick_position(preferred):
         for pos in preferred:
-            if pos in valid_positions and is_far_enough(pos, houses, min_grid_distance, GRID_SPACING):
-                valid_positions.remove(pos)
+            if is_open(pos):
                 return pos
         return None
 
@@ -109,7 +146,7 @@ def generate_coordinates(num_houses, *, north_pole, min_grid_distance, biased=Fa
             while placed < size and neighborhood and len(houses) < num_houses:
                 pos = pick_position(neighborhood)
                 if pos:
-                    houses.append({"id": len(houses) + 1, "x": pos[0], "y": pos[1]})
+                    place(pos)
                     placed += 1
                 else:
                     break
@@ -120,113 +157,324 @@ def generate_coordinates(num_houses, *, north_pole, min_grid_distance, biased=Fa
                 break
             pos = pick_position([target])
             if pos:
-                houses.append({"id": len(houses) + 1, "x": pos[0], "y": pos[1]})
+                place(pos)
 
-        # Fill remaining with any valid positions that are sufficiently spaced
-        while len(houses) < num_houses and valid_positions:
-            pos = pick_position(valid_positions)
-            if not pos:
+        # Fill remaining with any valid positions that are sufficiently spaced;
+        # cells never reopen, so one pass in shuffled order is enough
+        for pos in valid_positions:
+            if len(houses) >= num_houses:
                 break
-            houses.append({"id": len(houses) + 1, "x": pos[0], "y": pos[1]})
+            if is_open(pos):
+                place(pos)
     else:
         while len(houses) < num_houses and valid_positions:
             pos = valid_positions.pop()
-            if not is_far_enough(pos, houses, min_grid_distance, GRID_SPACING):
-                continue
-            houses.append({"id": len(houses) + 1, "x": pos[0], "y": pos[1]})
+            if is_open(pos):
+                place(pos)
 
     return houses[:num_houses]
 
 
+def generate_coordinate_batch(batch_size, num_houses, *, north_pole, min_grid_distance, biased=False, rng=None, max_rounds=20):
+    """
+    Sample many layouts at once as an int array of shape (B, num_houses, 2).
+
+    Unbiased layouts replay generate_coordinates' greedy placement (walk the
+    lattice in shuffled order, skip positions too close to a placed house) for
+    the whole batch in lockstep; rows that cannot fit num_houses are rejected
+    and resampled. Biased layouts are drawn one at a time from
+    generate_coordinates.
+    """
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+
+    if biased:
+        layouts = []
+        for _ in range(batch_size * max_rounds):
+            if len(layouts) == batch_size:
+                break
+            houses = generate_coordinates(
+                num_houses, north_pole=north_pole, min_grid_distance=min_grid_distance, biased=True
+            )
+            if len(houses) == num_houses:
+                layouts.append([(h["x"], h["y"]) for h in houses])
+        if len(layouts) < batch_size:
+            raise RuntimeError(f"Could only place {len(layouts)}/{batch_size} layouts of {num_houses} houses")
+        return np.array(layouts, dtype=int).reshape(batch_size, num_houses, 2)
+
+    positions = np.array(build_valid_positions(north_pole=north_pole), dtype=int)
+    cells = positions // GRID_SPACING
+    chebyshev = np.abs(cells[:, None, :] - cells[None, :, :]).max(axis=2)
+    conflicts = chebyshev < max(min_grid_distance, 1)  # a position always conflicts with itself
+    num_positions = len(positions)
+
+    accepted = []
+    missing = batch_size
+    for _ in range(max_rounds):
+        if missing <= 0:
+            break
+        order = np.argsort(rng.random((missing, num_positions)), axis=1)
+        open_mask = np.ones((missing, num_positions), dtype=bool)
+        chosen = np.zeros((missing, num_houses), dtype=int)
+        counts = np.zeros(missing, dtype=int)
+        rows = np.arange(missing)
+        for step in range(num_positions):
+            candidate = order[:, step]
+            take = open_mask[rows, candidate] & (counts < num_houses)
+            placed = rows[take]
+            chosen[placed, counts[placed]] = candidate[take]
+            counts[placed] += 1
+            open_mask[placed] &= ~conflicts[candidate[take]]
+            if (counts == num_houses).all():
+                break
+        full = counts == num_houses
+        accepted.append(positions[chosen[full]])
+        missing -= int(full.sum())
+
+    if missing > 0:
+        raise RuntimeError(f"Could only place {batch_size - missing}/{batch_size} layouts of {num_houses} houses")
+    return np.concatenate(accepted)[:batch_size]
+
+
+def houses_from_coordinates(coords):
+    """Convert one (n, 2) layout row back to the house dicts used in puzzle JSON."""
+    return [{"id": i + 1, "x": int(x), "y": int(y)} for i, (x, y) in enumerate(coords)]
+
+
+def node_coordinates(north_pole, houses):
+    """(n, 2) coordinate array with the north pole as node 0."""
+    return np.array([(north_pole["x"], north_pole["y"])] + [(h["x"], h["y"]) for h in houses], dtype=float)
+
+
+def calculate_distance_matrices(coords):
+    """Euclidean distance matrices for a stack of layouts: (B, n, 2) -> (B, n, n)."""
+    coords = np.asarray(coords, dtype=float)
+    batch, n, _ = coords.shape
+    rows, cols = np.triu_indices(n, k=1)
+    diff = coords[:, rows] - coords[:, cols]
+    upper = np.sqrt(diff[..., 0] ** 2 + diff[..., 1] ** 2)
+    distance_matrices = np.zeros((batch, n, n))
+    distance_matrices[:, rows, cols] = upper
+    distance_matrices[:, cols, rows] = upper
+    return distance_matrices
+
+
+@functools.lru_cache(maxsize=None)
+def lattice_table():
+    """
+    All lattice positions (including the north pole's) with a lookup from
+    (x, y) to lattice index and the pairwise distance table between them.
+    Built once and shared by every candidate.
+    """
+    positions = np.array(build_valid_positions(), dtype=float)
+    index = {(int(x), int(y)): i for i, (x, y) in enumerate(positions)}
+    table = calculate_distance_matrices(positions[None])[0]
+    table.setflags(write=False)
+    return positions, index, table
+
+
+def lattice_indices(north_pole, houses):
+    """Lattice index per node (north pole first), or None if any node is off the lattice."""
+    _, index, _ = lattice_table()
+    nodes = [north_pole] + houses
+    indices = [index.get((node["x"], node["y"])) for node in nodes]
+    if None in indices:
+        return None
+    return np.array(indices)
+
+
+def lattice_distance_matrices(indices):
+    """Gather distance matrices for a stack of lattice index rows: (B, n) -> (B, n, n)."""
+    _, _, table = lattice_table()
+    indices = np.asarray(indices)
+    return table[indices[:, :, None], indices[:, None, :]]
+
+
+def layout_distance_matrices(north_pole, layouts):
+    """Distance matrices (north pole as node 0) for a (B, n, 2) stack of lattice layouts."""
+    layouts = np.asarray(layouts)
+    _, index, _ = lattice_table()
+    cells = (GRID_SIZE - MIN_MARGIN) // GRID_SPACING
+    index_grid = np.full((cells, cells), -1)
+    for (x, y), i in index.items():
+        index_grid[lattice_cell((x, y))] = i
+    house_indices = index_grid[layouts[..., 0] // GRID_SPACING - 1, layouts[..., 1] // GRID_SPACING - 1]
+    pole_index = np.full((len(layouts), 1), index[(north_pole["x"], north_pole["y"])])
+    return lattice_distance_matrices(np.concatenate([pole_index, house_indices], axis=1))
+
+
 def calculate_distance_matrix(north_pole, houses):
-    nodes = [north_pole] + [{"x": h["x"], "y": h["y"]} for h in houses]
-    n = len(nodes)
-    distance_matrix = np.zeros((n, n))
-    for i in range(n):
-        for j in range(n):
-            if i == j:
-                continue
-            dx = nodes[i]["x"] - nodes[j]["x"]
-            dy = nodes[i]["y"] - nodes[j]["y"]
-            distance_matrix[i][j] = math.hypot(dx, dy)
-    return distance_matrix
+    indices = lattice_indices(north_pole, houses)
+    if indices is None:
+        return calculate_distance_matrices(node_coordinates(north_pole, houses)[None])[0]
+    return lattice_distance_matrices(indices[None])[0]
 
 
-def calculate_route_complexity(route):
-    if len(route) < 3:
+def _route_turns(coords):
+    """
+    Segment lengths and turn cosines for (..., m, 2) routes: returns
+    (lengths, dots, valid) where valid marks turns between non-degenerate segments.
+    """
+    segments = np.diff(np.asarray(coords, dtype=float), axis=-2)
+    dx, dy = segments[..., 0], segments[..., 1]
+    lengths = np.sqrt(dx * dx + dy * dy)
+    prev_mag, curr_mag = lengths[..., :-1], lengths[..., 1:]
+    valid = (prev_mag > 1e-6) & (curr_mag > 1e-6)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dots = (dx[..., :-1] / prev_mag) * (dx[..., 1:] / curr_mag) + (dy[..., :-1] / prev_mag) * (
+            dy[..., 1:] / curr_mag
+        )
+    dots = np.clip(np.where(valid, dots, 1.0), -1.0, 1.0)
+    return lengths, dots, valid
+
+
+def _arccos(values, coords):
+    """
+    Turn angles for the turn cosines of routes through coords. NumPy's SIMD
+    arccos can differ from libm in the last bit depending on where a value
+    falls in the array. Lattice routes (every point a multiple of
+    GRID_SPACING) only produce a small set of distinct cosines, so for them
+    each one is evaluated once with math.acos, which keeps the batched scores
+    bit-identical to the scalar ones. Off-lattice routes use np.arccos and may
+    differ between the two in the last bit.
+    """
+    if not np.all(np.asarray(coords) % GRID_SPACING == 0):
+        return np.arccos(values)
+    unique, inverse = np.unique(values, return_inverse=True)
+    return np.array([math.acos(v) for v in unique])[inverse].reshape(np.shape(values))
+
+
+def route_complexity(coords):
+    """Complexity of one route given as an (m, 2) coordinate array."""
+    coords = np.asarray(coords, dtype=float)
+    if len(coords) < 3:
         return 0
+    lengths, dots, valid = _route_turns(coords)
+    # cumsum keeps the left-to-right summation order of a plain loop
+    total_distance = np.cumsum(lengths)[-1]
+    angles = _arccos(dots[valid], coords)
+    direction_changes = int((dots[valid] < 0.7).sum())
+    angle_std = np.std(angles) if len(angles) else 0.0
+    return direction_changes * 120 + total_distance * 0.05 + angle_std * 80
+
+
+def route_complexities(coords):
+    """Complexity of a stack of routes given as a (B, m, 2) coordinate array."""
+    coords = np.asarray(coords, dtype=float)
+    if coords.shape[1] < 3:
+        return np.zeros(len(coords))
+    lengths, dots, valid = _route_turns(coords)
+    total_distance = np.cumsum(lengths, axis=1)[:, -1]
+    angles = _arccos(dots, coords)
+    # np.std over whole rows sums in the same order as np.std on one route; rows
+    # with degenerate turns (rare: repeated points) take the scalar path
+    angle_std = np.std(angles, axis=1)
+    for row in np.flatnonzero(~valid.all(axis=1)):
+        row_angles = angles[row, valid[row]]
+        angle_std[row] = np.std(row_angles) if len(row_angles) else 0.0
+    direction_changes = (valid & (dots < 0.7)).sum(axis=1)
+    return direction_changes * 120 + total_distance * 0.05 + angle_std * 80
+
 
-    direction_changes = 0
-    angles = []
-    total_distance = 0.0
-    prev_dx, prev_dy = None, None
-
-    for i in range(len(route) - 1):
-        dx = route[i + 1]["x"] - route[i]["x"]
-        dy = route[i + 1]["y"] - route[i]["y"]
-        dist = math.hypot(dx, dy)
-        total_distance += dist
-
-        if prev_dx is not None and prev_dy is not None:
-            prev_mag = math.hypot(prev_dx, prev_dy)
-            curr_mag = math.hypot(dx, dy)
-            if prev_mag > 1e-6 and curr_mag > 1e-6:
-                prev_norm = (prev_dx / prev_mag, prev_dy / prev_mag)
-                curr_norm = (dx / curr_mag, dy / curr_mag)
-                dot_product = prev_norm[0] * curr_norm[0] + prev_norm[1] * curr_norm[1]
-                dot_product = max(-1.0, min(1.0, dot_product))
-                angle = math.acos(dot_product)
-                angles.append(angle)
-                if dot_product < 0.7:
-                    direction_changes += 1
-        prev_dx, prev_dy = dx, dy
-
-    angle_std = np.std(angles) if angles else 0.0
-    complexity = direction_changes * 120 + total_distance * 0.05 + angle_std * 80
-    return complexity
-
-
-def solve_tsp_exact(north_pole, houses):
+def calculate_route_complexity(route):
+    return route_complexity([(stop["x"], stop["y"]) for stop in route])
+
+
+def resolve_exact_backend(num_nodes, backend=None):
+    """Map a backend name (or None/"auto") to the registered exact solver used for num_nodes."""
+    if backend not in (None, "auto"):
+        return backend
+    if num_nodes > HELD_KARP_MAX_NODES:
+        return "branch_and_bound"
+    # Seeded with the 2-opt tour, pruning leaves a small fraction of the DP states
+    return "held_karp_pruned"
+
+
+def solve_tsp_exact(
+    north_pole,
+    houses,
+    backend=None,
+    cross_check=None,
+    cache_path=None,
+    heuristic_tour=None,
+    edges=None,
+    fallback=True,
+    trace_memory=False,
+):
+    """
+    Solve exactly with the chosen backend; optionally re-solve with a second
+    backend and raise if the optimal distances differ. With cache_path, a
+    layout already in the exact-result cache (up to grid symmetry) skips the
+    solver; a cross-check always solves. Backends that support it only
+    consider the candidate edges left by 1-tree edge elimination.
+
+    heuristic_tour is a known (route, length) that seeds the solvers, and
+    edges the candidate edges already eliminated against its length (see
+    layout_bounds); missing ones are computed from NN + 2-opt.
+
+    A backend that hits its time limit hands over to its registered fallback
+    solver (recorded as run["fallback_from"]). Comparing solvers needs each
+    one's own answer, so fallback=False, or a cross-check, turns this off and
+    lets time-limited backends run to completion.
+
+    Returns (distance, permutation, distance_matrix, run) where run holds the
+    solver name and wall time of each solve; with trace_memory it also holds
+    their peak memory (see run_exact_solver).
+    """
     distance_matrix = calculate_distance_matrix(north_pole, houses)
     num_nodes = len(houses) + 1
     if num_nodes > MAX_HOUSES + 1:
         raise ValueError(f"Too many houses ({len(houses)}) for exact solver limit {MAX_HOUSES}.")
-    permutation, distance = solve_tsp_dynamic_programming(distance_matrix)
-    return distance, permutation, distance_matrix
-
-
-def nearest_neighbor_with_two_opt(distance_matrix, max_2opt_iters=30):
-    n = distance_matrix.shape[0]
-    unvisited = set(range(1, n))
-    route = [0]
-    current = 0
-    while unvisited:
-        nxt = min(unvisited, key=lambda j: distance_matrix[current, j])
-        unvisited.remove(nxt)
-        route.append(nxt)
-        current = nxt
-    route.append(0)
-
-    def route_distance(r):
-        return sum(distance_matrix[r[i], r[i + 1]] for i in range(len(r) - 1))
-
-    improved = True
-    iterations = 0
-    while improved and iterations < max_2opt_iters:
-        improved = False
-        iterations += 1
-        for i in range(1, len(route) - 2):
-            for k in range(i + 1, len(route) - 1):
-                a, b = route[i - 1], route[i]
-                c, d = route[k], route[k + 1]
-                current_len = distance_matrix[a, b] + distance_matrix[c, d]
-                new_len = distance_matrix[a, c] + distance_matrix[b, d]
-                if new_len + 1e-6 < current_len:
-                    route[i:k + 1] = reversed(route[i:k + 1])
-                    improved = True
-        if not improved:
-            break
-    return route, route_distance(route)
+    backend = resolve_exact_backend(num_nodes, backend)
+
+    if cache_path and not cross_check:
+        start = time.perf_counter()
+        cached = lookup_exact(cache_path, north_pole, houses)
+        if cached is not None:
+            permutation, distance, cached_solver = cached
+            run = {
+                "solver": cached_solver,
+                "seconds": time.perf_counter() - start,
+                "cached": True,
+            }
+            return distance, permutation, distance_matrix, run
+
+    initial_tour = None
+    entry = EXACT_SOLVERS.get(backend, {})
+    if not entry.get("uses_candidate_edges"):
+        edges = None
+    if entry.get("uses_candidate_edges") or any(
+        EXACT_SOLVERS.get(name, {}).get("uses_initial_tour") for name in (backend, cross_check)
+    ):
+        if heuristic_tour is None:
+            heuristic_tour = nearest_neighbor_with_two_opt(distance_matrix)
+            edges = None  # eliminated against a different tour
+        initial_tour, upper_bound = heuristic_tour
+        if entry.get("uses_candidate_edges") and edges is None:
+            edges = candidate_edges(distance_matrix, upper_bound)
+
+    fallback = fallback and not cross_check
+    permutation, distance, run = run_exact_solver(
+        backend,
+        distance_matrix,
+        initial_tour=initial_tour,
+        candidate_edges=edges,
+        trace_memory=trace_memory,
+        fallback=fallback,
+    )
+    if edges is not None:
+        run["candidate_edges"] = int(np.triu(edges, 1).sum())
+        run["total_edges"] = num_nodes * (num_nodes - 1) // 2
+    # The cross-check solves the full instance, so it also checks the edge elimination
+    if cross_check:
+        _, other_distance, other_run = run_exact_solver(
+            cross_check, distance_matrix, initial_tour=initial_tour, trace_memory=trace_memory, fallback=False
+        )
+        cross_check_exact(distance, other_distance, backend, cross_check)
+        run["cross_check"] = other_run
+    if cache_path:
+        store_exact(cache_path, north_pole, houses, permutation, distance, run["solver"])
+    return distance, permutation, distance_matrix, run
 
 
 def build_route_from_permutation(permutation, north_pole, houses):
@@ -242,13 +490,51 @@ def build_route_from_permutation(permutation, north_pole, houses):
     return route
 
 
-def score_candidate(north_pole, houses):
-    optimal_distance, permutation, distance_matrix = solve_tsp_exact(north_pole, houses)
+def layout_bounds(north_pole, houses):
+    """
+    The cheap per-layout work shared by the gap-bound screen and the exact
+    solve, done once: the distance matrix, the heuristic ensemble, and one
+    1-tree ascent against the best ensemble tour, giving both the lower bound
+    and the candidate edges. gap_bound is the most the (median ensemble)
+    heuristic gap can be: the median ensemble length against the lower bound.
+    """
+    distance_matrix = calculate_distance_matrix(north_pole, houses)
+    ensemble = heuristic_ensemble(distance_matrix, coords=node_coordinates(north_pole, houses))
+    best_tour = min(ensemble.values(), key=lambda tour: tour[1])
+    lower_bound, edges = edge_elimination(distance_matrix, best_tour[1])
+    median_length = float(np.median([length for _, length in ensemble.values()]))
+    return {
+        "distance_matrix": distance_matrix,
+        "ensemble": ensemble,
+        "best_tour": best_tour,
+        "candidate_edges": edges,
+        "gap_bound": max(0.0, (median_length - lower_bound) / lower_bound),
+    }
+
+
+def score_candidate(
+    north_pole, houses, solver=None, cross_check=None, cache_path=None, bounds=None, trace_memory=False
+):
+    if bounds is None:
+        bounds = layout_bounds(north_pole, houses)
+    optimal_distance, permutation, _, run = solve_tsp_exact(
+        north_pole,
+        houses,
+        backend=solver,
+        cross_check=cross_check,
+        cache_path=cache_path,
+        heuristic_tour=bounds["best_tour"],
+        edges=bounds["candidate_edges"],
+        trace_memory=trace_memory,
+    )
     optimal_route = build_route_from_permutation(permutation, north_pole, houses)
     complexity = calculate_route_complexity(optimal_route)
 
-    heuristic_path, heuristic_distance = nearest_neighbor_with_two_opt(distance_matrix)
-    heuristic_gap = max(0.0, (heuristic_distance - optimal_distance) / optimal_distance)
+    ensemble = bounds["ensemble"]
+    heuristic_gaps = {
+        name: max(0.0, (length - optimal_distance) / optimal_distance) for name, (_, length) in ensemble.items()
+    }
+    heuristic_gap = float(np.median(list(heuristic_gaps.values())))
 
     score = heuristic_gap * 1200 + complexity * 0.4
     return {
@@ -257,7 +543,11 @@ def score_candidate(north_pole, houses):
         "permutation": permutation,
         "complexity": complexity,
         "heuristic_gap": heuristic_gap,
+        "heuristic_gap_min": min(heuristic_gaps.values()),
+        "heuristic_gaps": heuristic_gaps,
         "score": score,
+        "solver": run["solver"],
+        "solver_run": run,
     }
 
 
@@ -267,29 +557,234 @@ DIFFICULTY_CONFIG = {
         "min_gap": 0.0,
         "min_complexity": 60,
         "candidates": 4,
+        "time_budget": 30,
         "min_grid_distance": 2,
         "biased": False,
+        "solver": "auto",
     },
     "medium": {
         "house_range": (14, 14),
-        "min_gap": 0.05,
+        "min_gap": 0.04,
         "min_complexity": 130,
-        "candidates": 6,
+        "candidates": 40,
+        "time_budget": 60,
         "min_grid_distance": 1,
         "biased": False,
+        "solver": "auto",
     },
     "hard": {
         "house_range": (16, 16),
-        "min_gap": 0.10,
+        "min_gap": 0.055,
         "min_complexity": 180,
-        "candidates": 1,
+        "candidates": 100,
+        "time_budget": 120,
         "min_grid_distance": 1,
         "biased": False,
+        "solver": "auto",
+    },
+    "expert": {
+        "house_range": (20, 20),
+        "min_gap": 0.055,
+        "min_complexity": 220,
+        "candidates": 40,
+        "time_budget": 300,
+        "min_grid_distance": 1,
+        "biased": False,
+        "solver": "branch_and_bound",
     },
 }
 
+DAILY_DIFFICULTIES = ["easy", "medium", "hard"]
+MAX_SAMPLES_PER_CANDIDATE = 20  # sampling cap so a screen that rejects everything still terminates
+
+
+def meets_thresholds(stats, cfg):
+    return stats["heuristic_gap"] >= cfg["min_gap"] and stats["complexity"] >= cfg["min_complexity"]
+
+
+def sample_layouts(num_houses, north_pole, cfg, counts, max_samples, deadline=None):
+    """
+    Pipeline stage 1: draw random layouts. Stops at the time.monotonic()
+    deadline, so a screen that rejects everything cannot outrun the budget.
+    """
+    for _ in range(max_samples):
+        if deadline is not None and time.monotonic() > deadline:
+            return
+        counts["sampled"] += 1
+        yield generate_coordinates(
+            num_houses,
+            north_pole=north_pole,
+            min_grid_distance=cfg["min_grid_distance"],
+            biased=cfg["biased"],
+        )
+
+
+def screen_layouts(layouts, num_houses, counts):
+    """Pipeline stage 2: drop layouts that could not place every house."""
+    for houses in layouts:
+        if len(houses) < num_houses:
+            counts["rejected_screen"] += 1
+            continue
+        yield houses
+
+
+def evaluate_layout(
+    north_pole, houses, min_gap, solver=None, cross_check=None, cache_path=None, trace_memory=False
+):
+    """
+    Screen one layout and, if it passes, exact-solve and score it. Runs in a
+    worker process so the screen is parallel too and its ensemble, tour and
+    candidate edges are reused by the solve. Layouts whose best-case gap is
+    below min_gap can never be accepted; they return stats None.
+
+    Returns (stats, gap_bound).
+    """
+    bounds = layout_bounds(north_pole, houses)
+    if bounds["gap_bound"] < min_gap:
+        return None, bounds["gap_bound"]
+    stats = score_candidate(
+        north_pole,
+        houses,
+        solver=solver,
+        cross_check=cross_check,
+        cache_path=cache_path,
+        bounds=bounds,
+        trace_memory=trace_memory,
+    )
+    return stats, bounds["gap_bound"]
+
+
+def score_layouts(
+    north_pole, layouts, min_gap, solver=None, cross_check=None, workers=None, cache_path=None, trace_memory=False
+):
+    """
+    Pipeline stage 3: screen, exact-solve and score layouts (evaluate_layout),
+    one in flight per worker process. Yields (houses, stats, gap_bound) in
+    completion order; closing the generator cancels work that has not started.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    task = (min_gap, solver, cross_check, cache_path, trace_memory)
+    if workers <= 1:
+        for houses in layouts:
+            yield (houses, *evaluate_layout(north_pole, houses, *task))
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = {}
+    layouts = iter(layouts)
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < workers:
+                houses = next(layouts, None)
+                if houses is None:
+                    exhausted = True
+                    break
+                pending[pool.submit(evaluate_layout, north_pole, houses, *task)] = houses
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield (pending.pop(future), *future.result())
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def search_candidates(
+    north_pole, num_houses, cfg, solver=None, cross_check=None, workers=None, cache_path=None, trace_memory=False
+):
+    """
+    Run the candidate pipeline until a candidate clears min_gap/min_complexity
+    or the candidate/time budget is spent.
+
+    Returns (accepted, best, counts): the accepted candidate (or None), the
+    best-scoring candidate seen, and per-stage counters. If the gap-bound
+    screen rejected every layout, best is the reject with the highest bound
+    (counted as screen_fallback); it is None only if no layout had enough houses.
+    """
+    counts = {
+        "sampled": 0,
+        "rejected_screen": 0,
+        "rejected_gap_bound": 0,
+        "scored": 0,
+        "rejected_threshold": 0,
+        "screen_fallback": 0,
+    }
+    deadline = time.monotonic() + cfg["time_budget"]
+    layouts = screen_layouts(
+        sample_layouts(
+            num_houses, north_pole, cfg, counts, cfg["candidates"] * MAX_SAMPLES_PER_CANDIDATE, deadline=deadline
+        ),
+        num_houses,
+        counts,
+    )
+    scored = score_layouts(
+        north_pole,
+        layouts,
+        cfg["min_gap"],
+        solver=solver,
+        cross_check=cross_check,
+        workers=workers,
+        cache_path=cache_path,
+        trace_memory=trace_memory,
+    )
+
+    accepted = None
+    best = None
+    screened_out = None
+    try:
+        for houses, stats, gap_bound in scored:
+            if stats is None:
+                counts["rejected_gap_bound"] += 1
+                if screened_out is None or gap_bound > screened_out[1]:
+                    screened_out = (houses, gap_bound)
+                continue
+            counts["scored"] += 1
+            candidate = {**stats, "houses": houses}
+            if best is None or candidate["score"] > best["score"]:
+                best = candidate
+            if meets_thresholds(candidate, cfg):
+                accepted = candidate
+                break
+            counts["rejected_threshold"] += 1
+            if counts["scored"] >= cfg["candidates"] or time.monotonic() > deadline:
+                break
+    finally:
+        scored.close()
+
+    if best is None and screened_out is not None:
+        houses = screened_out[0]
+        stats = score_candidate(
+            north_pole, houses, solver=solver, cross_check=cross_check, cache_path=cache_path, trace_memory=trace_memory
+        )
+        best = {**stats, "houses": houses}
+        counts["scored"] += 1
+        counts["screen_fallback"] += 1
+    return accepted, best, counts
+
+
+def describe_memory(run):
+    if "peak_memory_skipped" in run:
+        return f", peak memory not measured ({run['peak_memory_skipped']})"
+    return f", peak memory {run['peak_memory_mb']:.1f}MB" if "peak_memory_mb" in run else ""
+
+
+def log_solver_run(difficulty, run):
+    if run.get("cached"):
+        log(f"[{difficulty}] Solver {run['solver']}: cache hit ({run['seconds']:.3f}s)")
+        return
+    edges = f", {run['candidate_edges']}/{run['total_edges']} candidate edges" if "candidate_edges" in run else ""
+    fallback = f" (after {run['fallback_from']} hit its time limit)" if "fallback_from" in run else ""
+    log(f"[{difficulty}] Solver {run['solver']}{fallback}: {run['seconds']:.3f}s{describe_memory(run)}{edges}")
+    if "cross_check" in run:
+        other = run["cross_check"]
+        log(f"[{difficulty}] Cross-check {other['solver']} agrees: {other['seconds']:.3f}s{describe_memory(other)}")
+
 
-def generate_puzzle(date=None, difficulty="medium"):
+def generate_puzzle(
+    date=None, difficulty="medium", solver=None, cross_check=None, workers=None, cache_path=None, trace_memory=False
+):
     if date is None:
         date = datetime.now()
 
@@ -297,31 +792,52 @@ def generate_puzzle(date=None, difficulty="medium"):
         raise ValueError(f"Unknown difficulty '{difficulty}'")
 
     cfg = DIFFICULTY_CONFIG[difficulty]
+    solver = solver or cfg.get("solver", "auto")
     num_houses = random.randint(*cfg["house_range"])
     num_houses = min(num_houses, MAX_HOUSES)
 
     north_pole = {"x": GRID_SIZE // 2, "y": GRID_SIZE // 2}
 
-    log(f"[{difficulty}] Generating puzzle (houses={num_houses})...")
-    
-    # Generate the first candidate and use it
-    houses = generate_coordinates(
-        num_houses,
-        north_pole=north_pole,
-        min_grid_distance=cfg["min_grid_distance"],
-        biased=cfg["biased"],
+    log(
+        f"[{difficulty}] Generating puzzle (houses={num_houses}, "
+        f"budget={cfg['candidates']} candidates / {cfg['time_budget']}s)..."
     )
 
-    if len(houses) < num_houses:
-        raise RuntimeError(f"Insufficient houses placed ({len(houses)}/{num_houses})")
+    accepted, best, counts = search_candidates(
+        north_pole,
+        num_houses,
+        cfg,
+        solver=solver,
+        cross_check=cross_check,
+        workers=workers,
+        cache_path=cache_path,
+        trace_memory=trace_memory,
+    )
+    log(
+        f"[{difficulty}] Pipeline: sampled={counts['sampled']}, "
+        f"rejected by screen={counts['rejected_screen']}, "
+        f"rejected by gap bound={counts['rejected_gap_bound']}, exact-solved={counts['scored']}, "
+        f"rejected by thresholds={counts['rejected_threshold']}"
+    )
+    if best is None:
+        raise RuntimeError(
+            f"No layout to score: {counts['rejected_screen']} of {counts['sampled']} sampled layouts "
+            f"had fewer than {num_houses} houses"
+        )
+    if counts["screen_fallback"]:
+        log(
+            f"[{difficulty}] WARNING: gap-bound screen rejected all {counts['rejected_gap_bound']} layouts; "
+            f"using the one with the highest bound"
+        )
+    elif accepted is None:
+        log(f"[{difficulty}] WARNING: no candidate met min_gap/min_complexity within budget; using best score")
 
-    stats = score_candidate(north_pole, houses)
+    chosen = accepted or best
     log(
-        f"[{difficulty}] Generated: gap={stats['heuristic_gap']:.3f}, "
-        f"complexity={stats['complexity']:.1f}, score={stats['score']:.1f}"
+        f"[{difficulty}] Chosen: gap={chosen['heuristic_gap']:.3f} (min {chosen['heuristic_gap_min']:.3f}), "
+        f"complexity={chosen['complexity']:.1f}, score={chosen['score']:.1f}"
     )
-    
-    chosen = {**stats, "houses": houses}
+    log_solver_run(difficulty, chosen["solver_run"])
 
     houses = chosen["houses"]
     optimal_distance = chosen["optimal_distance"]
@@ -333,12 +849,14 @@ def generate_puzzle(date=None, difficulty="medium"):
         "houses": houses,
         "optimal_distance": float(optimal_distance),
         "optimal_route": optimal_route,
+        "solver": chosen["solver"],
     }
 
     solution = {
         "date": date.strftime("%Y-%m-%d"),
         "route": optimal_route,
         "optimal_distance": float(optimal_distance),
+        "solver": chosen["solver"],
     }
 
     return puzzle, solution
@@ -357,46 +875,184 @@ def save_puzzle(puzzle, output_path):
     print(f"Saved puzzle to {output_path}")
 
 
+def puzzle_paths(date, difficulty):
+    """Puzzle and solution file paths for a date and difficulty."""
+    base_path = Path(__file__).parent.parent / "public" / "puzzles" / date.strftime("%Y") / date.strftime("%m")
+    day = date.strftime("%d")
+    return base_path / f"{day}_{difficulty}.json", base_path / f"{day}_{difficulty}_solution.json"
+
+
+def generate_and_save(date, difficulty, solver=None, cross_check=None, cache_path=None, trace_memory=False):
+    """
+    Pool task: generate one puzzle (scoring candidates serially) and save the
+    puzzle and solution files. Returns the written paths.
+    """
+    # Pool processes are forked with the parent's RNG state; reseed so puzzles differ
+    random.seed()
+    puzzle, solution = generate_puzzle(
+        date,
+        difficulty=difficulty,
+        solver=solver,
+        cross_check=cross_check,
+        workers=1,
+        cache_path=cache_path,
+        trace_memory=trace_memory,
+    )
+    puzzle_path, solution_path = puzzle_paths(date, difficulty)
+    save_puzzle(puzzle, puzzle_path)
+    save_puzzle(solution, solution_path)
+    return puzzle_path, solution_path
+
+
+def solution_from_puzzle(puzzle):
+    """Rebuild the solution file contents from a saved puzzle."""
+    solution = {
+        "date": puzzle["date"],
+        "route": puzzle["optimal_route"],
+        "optimal_distance": puzzle["optimal_distance"],
+    }
+    if "solver" in puzzle:
+        solution["solver"] = puzzle["solver"]
+    return solution
+
+
+def generate_ahead(
+    date, days, difficulties, solver=None, cross_check=None, workers=None, cache_path=None, trace_memory=False
+):
+    """
+    Generate every missing puzzle from date through date + days, one puzzle per
+    worker process, earliest date first. Existing puzzles are never rewritten;
+    a missing solution next to one is rebuilt from it. Returns the
+    (date, difficulty) pairs that failed.
+    """
+    tasks = []
+    for day in (date + timedelta(days=offset) for offset in range(days + 1)):
+        for difficulty in difficulties:
+            puzzle_path, solution_path = puzzle_paths(day, difficulty)
+            if not puzzle_path.exists():
+                tasks.append((day, difficulty))
+            elif not solution_path.exists():
+                with open(puzzle_path) as f:
+                    save_puzzle(solution_from_puzzle(json.load(f)), solution_path)
+    log(f"Generating {len(tasks)} missing puzzles for {date:%Y-%m-%d} + {days} days ahead...")
+
+    failed = []
+    if not tasks:
+        return failed
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = {}
+        for day, difficulty in tasks:
+            future = pool.submit(generate_and_save, day, difficulty, solver, cross_check, cache_path, trace_memory)
+            futures[future] = (day, difficulty)
+        for future in as_completed(futures):
+            day, difficulty = futures[future]
+            try:
+                future.result()
+            except Exception as exc:
+                log(f"[{difficulty}] ERROR: failed to generate puzzle for {day:%Y-%m-%d}: {exc}")
+                failed.append((day, difficulty))
+            else:
+                log(f"[{difficulty}] Done {day:%Y-%m-%d}")
+    return failed
+
+
 def main():
-    if len(sys.argv) > 1:
+    parser = argparse.ArgumentParser(description="Generate daily TSP puzzles.")
+    parser.add_argument("date", nargs="?", help="puzzle date as YYYY-MM-DD (default: today)")
+    parser.add_argument("difficulty", nargs="?", help="only generate this difficulty")
+    parser.add_argument(
+        "--solver",
+        choices=["auto", *EXACT_SOLVERS],
+        help="exact solver backend (default: the difficulty's configured solver)",
+    )
+    parser.add_argument(
+        "--cross-check",
+        choices=list(EXACT_SOLVERS),
+        help="re-solve with this backend and fail if the optimal distances differ",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="processes used to score candidates, or puzzles generated at once with --ahead "
+        "(default: one per CPU)",
+    )
+    parser.add_argument(
+        "--ahead",
+        type=int,
+        metavar="N",
+        help="fill in missing puzzles from the date through the next N days, skipping existing files",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"always run the exact solver instead of reusing {DEFAULT_CACHE_PATH.name}",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="also log each exact solve's peak memory (repeats the solve in a child process)",
+    )
+    args = parser.parse_args()
+
+    if args.date:
         try:
-            date = datetime.strptime(sys.argv[1], "%Y-%m-%d")
+            date = datetime.strptime(args.date, "%Y-%m-%d")
         except ValueError:
-            print(f"Invalid date format: {sys.argv[1]}. Use YYYY-MM-DD")
+            print(f"Invalid date format: {args.date}. Use YYYY-MM-DD")
             sys.exit(1)
     else:
         date = datetime.now()
 
     # Optional difficulty filter
-    target_difficulty = None
-    if len(sys.argv) > 2:
-        target_difficulty = sys.argv[2]
-        if target_difficulty not in DIFFICULTY_CONFIG:
-            print(f"Unknown difficulty: {target_difficulty}. Use: easy, medium, hard")
-            sys.exit(1)
+    target_difficulty = args.difficulty
+    if target_difficulty and target_difficulty not in DIFFICULTY_CONFIG:
+        print(f"Unknown difficulty: {target_difficulty}. Use: {', '.join(DIFFICULTY_CONFIG)}")
+        sys.exit(1)
 
-    year = date.strftime("%Y")
-    month = date.strftime("%m")
-    day = date.strftime("%d")
-    base_path = Path(__file__).parent.parent / "public" / "puzzles" / year / month
+    difficulties = [target_difficulty] if target_difficulty else DAILY_DIFFICULTIES
+    cache_path = None if args.no_cache else DEFAULT_CACHE_PATH
 
-    difficulties = [target_difficulty] if target_difficulty else ["easy", "medium", "hard"]
+    if args.ahead is not None:
+        if args.ahead < 0:
+            print(f"--ahead must be >= 0, got {args.ahead}")
+            sys.exit(1)
+        failed = generate_ahead(
+            date.replace(hour=0, minute=0, second=0, microsecond=0),
+            args.ahead,
+            difficulties,
+            solver=args.solver,
+            cross_check=args.cross_check,
+            workers=args.workers,
+            cache_path=cache_path,
+            trace_memory=args.trace_memory,
+        )
+        if failed:
+            sys.exit(1)
+        log(f"\nAll puzzles present through {date + timedelta(days=args.ahead):%Y-%m-%d}.")
+        return
 
     log(f"Generating puzzles for {date.strftime('%Y-%m-%d')}...")
 
     for difficulty in difficulties:
         log(f"\n[{difficulty}] Starting generation...")
-        puzzle, solution = generate_puzzle(date, difficulty=difficulty)
+        puzzle, solution = generate_puzzle(
+            date,
+            difficulty=difficulty,
+            solver=args.solver,
+            cross_check=args.cross_check,
+            workers=args.workers,
+            cache_path=cache_path,
+            trace_memory=args.trace_memory,
+        )
 
-        puzzle_path = base_path / f"{day}_{difficulty}.json"
-        solution_path = base_path / f"{day}_{difficulty}_solution.json"
+        puzzle_path, solution_path = puzzle_paths(date, difficulty)
 
         save_puzzle(puzzle, puzzle_path)
         save_puzzle(solution, solution_path)
 
         log(
             f"[{difficulty}] Done. Houses={len(puzzle['houses'])}, "
-            f"Optimal distance={puzzle['optimal_distance']:.2f}"
+            f"Optimal distance={puzzle['optimal_distance']:.2f}, solver={puzzle['solver']}"
         )
 
     log(f"\nAll puzzles generated for {date.strftime('%Y-%m-%d')}.")
@@ -0,0 +1,396 @@
+"""
+Human-like TSP heuristics used to estimate how hard a puzzle feels.
+
+Tours are closed routes over a square distance matrix (node 0 is the north
+pole): [0, ..., 0].
+"""
+
+import numpy as np
+
+
+def close_at_pole(order):
+    """Rotate a tour (node list, not closed) to start at node 0 and close it."""
+    order = list(order)
+    start = order.index(0)
+    return order[start:] + order[:start] + [0]
+
+
+def walk_cycle(neighbours):
+    """Node order of a Hamiltonian cycle given as degree-2 neighbour lists, from node 0 (not closed)."""
+    order = [0]
+    prev, node = 0, neighbours[0][0]
+    while node != 0:
+        order.append(node)
+        a, b = neighbours[node]
+        prev, node = node, (b if a == prev else a)
+    return order
+
+
+def nearest_neighbor_tour(distance_matrix, start=0):
+    """Nearest-neighbour tour from start using a masked argmin per step."""
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    route = [start]
+    current = start
+    for _ in range(n - 1):
+        current = int(np.argmin(np.where(visited, np.inf, dist[current])))
+        visited[current] = True
+        route.append(current)
+    return close_at_pole(route)
+
+
+def nearest_neighbor_tours(distance_matrices):
+    """Nearest-neighbour tours for a stack of matrices: (B, n, n) -> (B, n + 1) closed tours."""
+    dist = np.asarray(distance_matrices, dtype=float)
+    batch, n, _ = dist.shape
+    rows = np.arange(batch)
+    tours = np.zeros((batch, n + 1), dtype=int)
+    visited = np.zeros((batch, n), dtype=bool)
+    visited[:, 0] = True
+    current = np.zeros(batch, dtype=int)
+    for step in range(1, n):
+        current = np.argmin(np.where(visited, np.inf, dist[rows, current]), axis=1)
+        visited[rows, current] = True
+        tours[:, step] = current
+    return tours
+
+
+def neighbour_lists(distance_matrix, count):
+    """The count nearest other nodes of every node, closest first: (n, count) int array."""
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    count = min(count, n - 1)
+    order = np.argsort(dist + np.diag(np.full(n, np.inf)), axis=1, kind="stable")
+    return order[:, :count]
+
+
+def tour_length(distance_matrix, route):
+    route = np.asarray(route)
+    return float(np.asarray(distance_matrix)[route[:-1], route[1:]].sum())
+
+
+def two_opt(distance_matrix, route, neighbours=None, neighbour_count=10, tolerance=1e-6):
+    """
+    2-opt local search from a closed route, returning (route, length).
+
+    Only moves that add an edge to one of a node's nearest neighbours are
+    tried; nodes whose surroundings have not changed are skipped via
+    don't-look bits. Each move is priced in O(1), the tour length is updated
+    incrementally and the shorter side of the cycle is reversed in place.
+    """
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    length = tour_length(dist, route)
+    if n < 4:
+        return list(route), length
+    if neighbours is None:
+        neighbours = neighbour_lists(dist, neighbour_count)
+    d = dist.tolist()
+    near = neighbours.tolist()
+
+    order = list(route[:-1])
+    pos = [0] * n
+    for i, node in enumerate(order):
+        pos[node] = i
+
+    def reverse(i, j):
+        """Reverse order[i..j] (cyclic, inclusive), or equivalently its complement."""
+        span = (j - i) % n + 1
+        if 2 * span > n:
+            i, j, span = (j + 1) % n, (i - 1) % n, n - span
+        for _ in range(span // 2):
+            a, b = order[i], order[j]
+            order[i], order[j] = b, a
+            pos[b], pos[a] = i, j
+            i = (i + 1) % n
+            j = (j - 1) % n
+
+    active = list(range(n))
+    queued = [True] * n
+    while active:
+        a = active.pop()
+        queued[a] = False
+        improved = True
+        while improved:
+            improved = False
+            for forward in (True, False):
+                b = order[(pos[a] + 1) % n] if forward else order[(pos[a] - 1) % n]
+                d_ab = d[a][b]
+                for c in near[a]:
+                    d_ac = d[a][c]
+                    if d_ac + tolerance >= d_ab:
+                        break
+                    e = order[(pos[c] + 1) % n] if forward else order[(pos[c] - 1) % n]
+                    if c == b or e == a:
+                        continue
+                    delta = d_ac + d[b][e] - d_ab - d[c][e]
+                    if delta < -tolerance:
+                        # Replace (a, b), (c, e) with (a, c), (b, e)
+                        if forward:
+                            reverse(pos[b], pos[c])
+                        else:
+                            reverse(pos[c], pos[b])
+                        length += delta
+                        for node in (a, b, c, e):
+                            if not queued[node]:
+                                queued[node] = True
+                                active.append(node)
+                        improved = True
+                        break
+                if improved:
+                    break
+
+    return close_at_pole(order), length
+
+
+def nearest_neighbor_with_two_opt(distance_matrix, neighbours=None):
+    return two_opt(distance_matrix, nearest_neighbor_tour(distance_matrix), neighbours=neighbours)
+
+
+def tour_lengths(distance_matrices, tours):
+    """Lengths of a (B, n + 1) stack of closed tours."""
+    dist = np.asarray(distance_matrices, dtype=float)
+    tours = np.asarray(tours)
+    rows = np.arange(len(tours))[:, None]
+    return dist[rows, tours[:, :-1], tours[:, 1:]].sum(axis=1)
+
+
+def two_opt_batch(distance_matrices, tours, tolerance=1e-6):
+    """
+    Best-improvement 2-opt over a stack of closed tours, returning (tours, lengths).
+
+    Each round prices every (i, k) segment reversal of every still-improving
+    tour in one NumPy expression, applies the best move per tour and drops
+    tours that have no improving move left.
+    """
+    dist = np.asarray(distance_matrices, dtype=float)
+    batch, n, _ = dist.shape
+    tours = np.array(tours, dtype=int)
+    if n < 4:
+        return tours, tour_lengths(dist, tours)
+
+    # Reversing tours[i..k] swaps edges (i-1, i), (k, k+1) for (i-1, k), (i, k+1)
+    first, last = np.triu_indices(n, k=1)
+    keep = first >= 1
+    first, last = first[keep], last[keep]
+    flat = dist.reshape(batch, n * n)
+    positions = np.arange(n + 1)
+
+    active = np.arange(batch)
+    while len(active):
+        current = tours[active]
+        a = current[:, first - 1]
+        b = current[:, first]
+        c = current[:, last]
+        d = current[:, last + 1]
+        rows = active[:, None]
+        delta = flat[rows, a * n + c] + flat[rows, b * n + d] - flat[rows, a * n + b] - flat[rows, c * n + d]
+        best = np.argmin(delta, axis=1)
+        improving = delta[np.arange(len(active)), best] < -tolerance
+
+        i = first[best[improving]][:, None]
+        k = last[best[improving]][:, None]
+        inside = (positions >= i) & (positions <= k)
+        source = np.where(inside, i + k - positions, positions)
+        tours[active[improving]] = np.take_along_axis(current[improving], source, axis=1)
+        active = active[improving]
+
+    return tours, tour_lengths(dist, tours)
+
+
+def nearest_neighbor_with_two_opt_batch(distance_matrices):
+    """Batched nearest_neighbor_with_two_opt: (B, n, n) -> ((B, n + 1) tours, (B,) lengths)."""
+    return two_opt_batch(distance_matrices, nearest_neighbor_tours(distance_matrices))
+
+
+def greedy_edge_tour(distance_matrix):
+    """Greedy matching: add the shortest edges that keep every degree <= 2 and close no early cycle."""
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    if n < 3:
+        return list(range(n)) + [0]
+    rows, cols = np.triu_indices(n, k=1)
+    degree = [0] * n
+    group = list(range(n))
+    neighbours = [[] for _ in range(n)]
+
+    def root(node):
+        while group[node] != node:
+            group[node] = group[group[node]]
+            node = group[node]
+        return node
+
+    added = 0
+    for edge in np.argsort(dist[rows, cols], kind="stable"):
+        a, b = int(rows[edge]), int(cols[edge])
+        if degree[a] == 2 or degree[b] == 2:
+            continue
+        ra, rb = root(a), root(b)
+        if ra == rb and added < n - 1:
+            continue
+        group[ra] = rb
+        degree[a] += 1
+        degree[b] += 1
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+        added += 1
+        if added == n:
+            break
+
+    return walk_cycle(neighbours) + [0]
+
+
+def _insertion_tour(dist, initial, choose):
+    """
+    Grow a closed tour by insertion. choose(tour_nodes, outside, costs) picks
+    the next node index into outside, where costs[k] is the cheapest insertion
+    cost of outside[k]; the node then goes into its cheapest edge.
+    """
+    n = dist.shape[0]
+    route = list(initial)
+    outside = [v for v in range(n) if v not in set(route)]
+    while outside:
+        order = np.array(route)
+        u, v = order[:-1], order[1:]
+        candidates = np.array(outside)
+        # (edges, candidates) insertion cost matrix
+        cost = dist[u][:, candidates] + dist[candidates][:, v].T - dist[u, v][:, None]
+        best_edge = np.argmin(cost, axis=0)
+        pick = choose(order, candidates, cost[best_edge, np.arange(len(candidates))])
+        route.insert(int(best_edge[pick]) + 1, int(candidates[pick]))
+        outside.pop(pick)
+    return close_at_pole(route[:-1])
+
+
+def cheapest_insertion_tour(distance_matrix):
+    dist = np.asarray(distance_matrix, dtype=float)
+    if dist.shape[0] < 3:
+        return list(range(dist.shape[0])) + [0]
+    far = int(np.argmax(dist[0]))
+    return _insertion_tour(dist, [0, far, 0], lambda tour, outside, costs: int(np.argmin(costs)))
+
+
+def farthest_insertion_tour(distance_matrix):
+    dist = np.asarray(distance_matrix, dtype=float)
+    if dist.shape[0] < 3:
+        return list(range(dist.shape[0])) + [0]
+    far = int(np.argmax(dist[0]))
+
+    def farthest(tour, outside, costs):
+        return int(np.argmax(dist[np.ix_(outside, tour)].min(axis=1)))
+
+    return _insertion_tour(dist, [0, far, 0], farthest)
+
+
+def convex_hull(coords):
+    """Indices of the convex hull of (n, 2) coords in counter-clockwise order (monotone chain)."""
+    points = sorted(range(len(coords)), key=lambda i: (coords[i][0], coords[i][1]))
+
+    def cross(o, a, b):
+        return (coords[a][0] - coords[o][0]) * (coords[b][1] - coords[o][1]) - (
+            coords[a][1] - coords[o][1]
+        ) * (coords[b][0] - coords[o][0])
+
+    lower = []
+    upper = []
+    for i in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], i) <= 0:
+            lower.pop()
+        lower.append(i)
+    for i in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], i) <= 0:
+            upper.pop()
+        upper.append(i)
+    return lower[:-1] + upper[:-1]
+
+
+def convex_hull_insertion_tour(distance_matrix, coords):
+    """Start from the convex hull, then insert the node with the smallest detour ratio."""
+    dist = np.asarray(distance_matrix, dtype=float)
+    hull = convex_hull(np.asarray(coords).tolist())
+    if len(hull) < 3:
+        return cheapest_insertion_tour(dist)
+    hull = hull + [hull[0]]
+
+    def smallest_ratio(tour, outside, costs):
+        u, v = tour[:-1], tour[1:]
+        edge = dist[u, v][:, None]
+        ratio = (dist[u][:, outside] + dist[outside][:, v].T) / np.where(edge > 0, edge, np.inf)
+        return int(np.argmin(ratio.min(axis=0)))
+
+    return _insertion_tour(dist, hull, smallest_ratio)
+
+
+def or_opt(distance_matrix, route, tolerance=1e-6, max_segment=3):
+    """
+    Or-opt local search: move segments of 1..max_segment nodes (either
+    orientation) to a cheaper place in the tour. Returns (route, length).
+    """
+    dist = np.asarray(distance_matrix, dtype=float)
+    d = dist.tolist()
+    order = list(route[:-1])
+    n = len(order)
+    improved = True
+    while improved and n >= 5:
+        improved = False
+        for size in range(1, max_segment + 1):
+            for i in range(n):
+                segment = [order[(i + k) % n] for k in range(size)]
+                prev, nxt = order[(i - 1) % n], order[(i + size) % n]
+                first, last = segment[0], segment[-1]
+                removal = d[prev][first] + d[last][nxt] - d[prev][nxt]
+                rest = [order[(i + size + k) % n] for k in range(n - size)]
+                for j in range(len(rest) - 1):
+                    u, v = rest[j], rest[j + 1]
+                    forward = d[u][first] + d[last][v] - d[u][v]
+                    backward = d[u][last] + d[first][v] - d[u][v]
+                    if min(forward, backward) < removal - tolerance:
+                        moved = segment if forward <= backward else segment[::-1]
+                        order = rest[:j + 1] + moved + rest[j + 1:]
+                        improved = True
+                        break
+                if improved:
+                    break
+            if improved:
+                break
+    route = close_at_pole(order)
+    return route, tour_length(dist, route)
+
+
+ENSEMBLE_STARTS = 4
+
+
+def heuristic_ensemble(distance_matrix, coords=None, starts=ENSEMBLE_STARTS):
+    """
+    Run the human-like heuristic ensemble on one distance matrix.
+
+    Returns {name: (route, length)}. Neighbour lists are computed once and
+    shared by every 2-opt run; convex-hull insertion needs coords.
+    """
+    dist = np.asarray(distance_matrix, dtype=float)
+    n = dist.shape[0]
+    neighbours = neighbour_lists(dist, 10)
+
+    baseline = nearest_neighbor_with_two_opt(dist, neighbours=neighbours)
+    results = {"nearest_neighbor_2opt": baseline}
+
+    best = baseline
+    for start in np.unique(np.linspace(0, n - 1, starts).astype(int))[1:]:
+        tour = two_opt(dist, nearest_neighbor_tour(dist, start=int(start)), neighbours=neighbours)
+        if tour[1] < best[1]:
+            best = tour
+    results["nearest_neighbor_multi_start"] = best
+    results["nearest_neighbor_or_opt"] = or_opt(dist, baseline[0])
+
+    for name, route in (
+        ("greedy_edge", greedy_edge_tour(dist)),
+        ("cheapest_insertion", cheapest_insertion_tour(dist)),
+        ("farthest_insertion", farthest_insertion_tour(dist)),
+    ):
+        results[name] = (route, tour_length(dist, route))
+    if coords is not None:
+        route = convex_hull_insertion_tour(dist, coords)
+        results["convex_hull_insertion"] = (route, tour_length(dist, route))
+    return results
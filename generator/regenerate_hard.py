@@ -1,108 +1,281 @@
 #!/usr/bin/env python3
 """
-Regenerate all hard puzzles for December 2025, starting from today backwards.
-Commits and pushes after each puzzle.
+Regenerate puzzles for a range of dates and difficulties (by default: hard
+puzzles from day 1 of the current month to today). Ranges may span months and
+years, e.g. to rebuild the archive after changing DIFFICULTY_CONFIG.
+
+generate_puzzle is imported once and puzzles are fanned out over a process
+pool, longest-running difficulty first so the slowest solves start early.
+Written files are staged with one git add and committed once per run (or per
+--commit-every puzzles), then pushed once at the end.
+
+Progress is checkpointed in a JSON-lines journal: each finished
+(date, difficulty) is recorded with the hash of the puzzle it wrote and of the
+difficulty's config, so a rerun skips that work (while the file and config
+still match) and only retries what failed or never ran. The journal is removed
+once a run has committed (and pushed) everything; --restart discards it early.
+
+Usage:
+  python generator/regenerate_hard.py [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+                                      [--difficulty NAME[,NAME...]|all] [--workers N]
+                                      [--commit-every N] [--no-push]
+                                      [--journal PATH] [--restart]
 """
+import argparse
+import hashlib
+import json
+import os
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
 from pathlib import Path
-from datetime import datetime
+
+from exact_cache import DEFAULT_CACHE_PATH
+from generate_puzzle import DIFFICULTY_CONFIG, generate_and_save, puzzle_paths
+
+JOURNAL_PATH = Path(__file__).parent / "backfill_journal.jsonl"
+
+
+def expected_cost(difficulty):
+    """Sort key for scheduling: bigger layouts and longer search budgets first."""
+    cfg = DIFFICULTY_CONFIG[difficulty]
+    return max(cfg["house_range"]), cfg["time_budget"]
+
+
+def content_hash(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def config_hash(difficulty):
+    return hashlib.sha256(json.dumps(DIFFICULTY_CONFIG[difficulty], sort_keys=True).encode()).hexdigest()
+
+
+def load_journal(journal_path):
+    """(date, difficulty) -> (content hash, config hash) for work the journal records as done."""
+    finished = {}
+    if not journal_path.exists():
+        return finished
+    with open(journal_path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line torn by a crash mid-write
+            key = (entry["date"], entry["difficulty"])
+            if entry["status"] == "done":
+                finished[key] = (entry["hash"], entry.get("config"))
+            else:
+                finished.pop(key, None)
+    return finished
+
+
+def record(journal, date_str, difficulty, status, **fields):
+    journal.write(json.dumps({"date": date_str, "difficulty": difficulty, "status": status, **fields}) + "\n")
+    journal.flush()
+    os.fsync(journal.fileno())
+
+
+def is_finished(finished, date, difficulty):
+    key = (date.strftime("%Y-%m-%d"), difficulty)
+    puzzle_path, _ = puzzle_paths(date, difficulty)
+    return (
+        key in finished
+        and puzzle_path.exists()
+        and finished[key] == (content_hash(puzzle_path), config_hash(difficulty))
+    )
+
+
+def git(repo_root, *args):
+    return subprocess.run(["git", *args], cwd=str(repo_root), capture_output=True)
+
+
+def commit_puzzles(repo_root, done):
+    """
+    Stage and commit one chunk of regenerated puzzles; done is
+    [(date_str, difficulty, paths)]. Returns False if git failed.
+    """
+    done = sorted(done)
+    dates = [date_str for date_str, _, _ in done]
+    difficulties = sorted({difficulty for _, difficulty, _ in done}, key=list(DIFFICULTY_CONFIG).index)
+    paths = [str(path) for _, _, written in done for path in written]
+
+    # One add for the whole chunk (force, since solutions may be ignored)
+    add_result = git(repo_root, "add", "-f", *paths)
+    if add_result.returncode != 0:
+        print("ERROR: Failed to add puzzle files to git")
+        print(add_result.stderr.decode())
+        return False
+
+    if len(done) == 1:
+        commit_msg = f"Regenerate {difficulties[0]} puzzle for {dates[0]}"
+    else:
+        commit_msg = f"Regenerate {len(done)} {'/'.join(difficulties)} puzzles ({dates[0]} to {dates[-1]})"
+    body = "\n".join(f"{date_str} {difficulty}" for date_str, difficulty, _ in done)
+    # Commit with --no-verify to skip hooks; the body lists every puzzle in the chunk
+    commit_result = git(repo_root, "commit", "--no-verify", "-m", commit_msg, "-m", body, "--", *paths)
+    if commit_result.returncode != 0:
+        error_msg = commit_result.stderr.decode() + commit_result.stdout.decode()
+        if "nothing to commit" not in error_msg.lower():
+            print(f"ERROR: Commit failed: {error_msg}")
+            return False
+        print(f"No changes to commit for {dates[0]}..{dates[-1]}")
+    else:
+        print(f"Committed: {commit_msg}")
+    return True
+
+
+def push(repo_root):
+    push_result = git(repo_root, "push")
+    if push_result.returncode != 0:
+        print("ERROR: Failed to push")
+        print(push_result.stderr.decode())
+        sys.exit(1)
+    print("Pushed regenerated puzzles")
+
+
+def uncommitted(repo_root, done):
+    """The entries of done whose files differ from HEAD (e.g. a run died before committing)."""
+    if not done:
+        return []
+    paths = [str(path) for _, _, written in done for path in written]
+    status = git(repo_root, "status", "--porcelain", "--", *paths).stdout.decode()
+    changed = {(Path(repo_root) / line[3:]).resolve() for line in status.splitlines()}
+    return [entry for entry in done if any(path.resolve() in changed for path in entry[2])]
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date format: {value}. Use YYYY-MM-DD")
+
+
+def parse_difficulties(value):
+    if value == "all":
+        return list(DIFFICULTY_CONFIG)
+    difficulties = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in difficulties if name not in DIFFICULTY_CONFIG]
+    if unknown or not difficulties:
+        raise argparse.ArgumentTypeError(
+            f"Unknown difficulty: {', '.join(unknown) or value!r}. Use: {', '.join(DIFFICULTY_CONFIG)} or all"
+        )
+    return list(dict.fromkeys(difficulties))
+
 
 def main():
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    parser = argparse.ArgumentParser(description="Regenerate puzzles for a range of dates.")
+    parser.add_argument(
+        "--from",
+        dest="start",
+        type=parse_date,
+        default=today.replace(day=1),
+        help="first date to regenerate (default: day 1 of this month)",
+    )
+    parser.add_argument("--to", dest="end", type=parse_date, default=today, help="last date (default: today)")
+    parser.add_argument(
+        "--difficulty",
+        dest="difficulties",
+        type=parse_difficulties,
+        default=["hard"],
+        help="comma-separated difficulties, or all (default: hard)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="puzzles generated in parallel (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--commit-every",
+        type=int,
+        default=0,
+        help="commit after every N finished puzzles (default: one commit for the run)",
+    )
+    parser.add_argument("--no-push", action="store_true", help="commit locally but do not push")
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        default=JOURNAL_PATH,
+        help=f"checkpoint journal (default: generator/{JOURNAL_PATH.name})",
+    )
+    parser.add_argument("--restart", action="store_true", help="ignore and truncate the journal")
+    args = parser.parse_args()
+
+    if args.start > args.end:
+        parser.error(f"--from {args.start:%Y-%m-%d} is after --to {args.end:%Y-%m-%d}")
+
     # Get the repository root (parent of generator directory)
     repo_root = Path(__file__).parent.parent
-    
-    # Start from today and go backwards
-    today = datetime.now()
-    start_day = today.day
-    year = today.year
-    month = today.month
-    
-    # Generate hard puzzles from today backwards to day 1
-    for day in range(start_day, 0, -1):
-        date_str = f"{year}-{month:02d}-{day:02d}"
-        print(f"\n{'='*60}")
-        print(f"Regenerating hard puzzle for {date_str}")
-        print(f"{'='*60}\n")
-        
-        # Generate the puzzle
-        generator_script = repo_root / "generator" / "generate_puzzle.py"
-        result = subprocess.run(
-            [sys.executable, str(generator_script), date_str, "hard"],
-            cwd=str(repo_root),
-            capture_output=False
-        )
-        
-        if result.returncode != 0:
-            print(f"ERROR: Failed to generate puzzle for {date_str}")
-            sys.exit(1)
-        
-        # Commit and push
-        print(f"\nCommitting and pushing {date_str} hard puzzle...")
-        
-        # Add the puzzle files (force add solution since it's in .gitignore)
-        puzzle_path = f"public/puzzles/{year}/{month:02d}/{day:02d}_hard.json"
-        solution_path = f"public/puzzles/{year}/{month:02d}/{day:02d}_hard_solution.json"
-        
-        # Add puzzle file
-        add_result = subprocess.run(
-            ["git", "add", puzzle_path],
-            cwd=str(repo_root),
-            capture_output=True
-        )
-        
-        if add_result.returncode != 0:
-            print(f"ERROR: Failed to add puzzle file to git")
-            print(add_result.stderr.decode())
-            sys.exit(1)
-        
-        # Force add solution file (it's in .gitignore)
-        add_result = subprocess.run(
-            ["git", "add", "-f", solution_path],
-            cwd=str(repo_root),
-            capture_output=True
-        )
-        
-        if add_result.returncode != 0:
-            print(f"ERROR: Failed to add solution file to git")
-            print(add_result.stderr.decode())
-            sys.exit(1)
-        
-        # Commit with --no-verify to skip hooks
-        commit_msg = f"Regenerate hard puzzle for {date_str} (16 nodes, no clustering)"
-        commit_result = subprocess.run(
-            ["git", "commit", "--no-verify", "-m", commit_msg],
-            cwd=str(repo_root),
-            capture_output=True
-        )
-        
-        if commit_result.returncode != 0:
-            error_msg = commit_result.stderr.decode()
-            if "nothing to commit" in error_msg.lower():
-                print(f"No changes to commit for {date_str}")
-            else:
-                print(f"WARNING: Commit failed: {error_msg}")
-        else:
-            print(f"Committed: {commit_msg}")
-        
-        # Push (git push doesn't have --no-verify, but we can use --no-verify on the commit)
-        push_result = subprocess.run(
-            ["git", "push"],
-            cwd=str(repo_root),
-            capture_output=True
-        )
-        
-        if push_result.returncode != 0:
-            print(f"ERROR: Failed to push")
-            print(push_result.stderr.decode())
-            sys.exit(1)
-        
-        print(f"Pushed: {date_str} hard puzzle")
-    
+
+    if args.restart and args.journal.exists():
+        args.journal.unlink()
+    finished = load_journal(args.journal)
+
+    dates = [args.end - timedelta(days=offset) for offset in range((args.end - args.start).days + 1)]
+    # The pool starts tasks in submission order: slowest difficulty first, newest date first within it
+    tasks = [
+        (date, difficulty)
+        for difficulty in sorted(args.difficulties, key=expected_cost, reverse=True)
+        for date in dates
+    ]
+    skipped = [task for task in tasks if is_finished(finished, *task)]
+    tasks = [task for task in tasks if task not in skipped]
+    label = "/".join(sorted(args.difficulties, key=list(DIFFICULTY_CONFIG).index))
+    print(
+        f"Regenerating {len(tasks)} {label} puzzles from {args.start:%Y-%m-%d} to {args.end:%Y-%m-%d} "
+        f"with {args.workers} workers ({len(skipped)} already done per {args.journal.name})"
+    )
+
+    # Finished work a previous run never got to commit
+    done = uncommitted(
+        repo_root,
+        [(date.strftime("%Y-%m-%d"), difficulty, puzzle_paths(date, difficulty)) for date, difficulty in skipped],
+    )
+    failed = []
+    with open(args.journal, "a") as journal, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(generate_and_save, date, difficulty, cache_path=DEFAULT_CACHE_PATH): (date, difficulty)
+            for date, difficulty in tasks
+        }
+        for future in as_completed(futures):
+            date, difficulty = futures[future]
+            date_str = date.strftime("%Y-%m-%d")
+            try:
+                puzzle_path, solution_path = future.result()
+            except Exception as exc:
+                print(f"ERROR: Failed to generate {difficulty} puzzle for {date_str}: {exc}")
+                record(journal, date_str, difficulty, "failed", error=str(exc))
+                failed.append(f"{date_str} {difficulty}")
+                continue
+            record(
+                journal, date_str, difficulty, "done", hash=content_hash(puzzle_path), config=config_hash(difficulty)
+            )
+            done.append((date_str, difficulty, (puzzle_path, solution_path)))
+            if args.commit_every and len(done) >= args.commit_every:
+                if not commit_puzzles(repo_root, done):
+                    # The journal keeps the finished work; a rerun commits it
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    sys.exit(1)
+                done = []
+
+    if done and not commit_puzzles(repo_root, done):
+        sys.exit(1)
+    if not args.no_push:
+        push(repo_root)
+    if failed:
+        print(f"ERROR: {len(failed)} puzzles failed ({', '.join(sorted(failed))}); rerun to retry them")
+        sys.exit(1)
+
+    # Everything is committed (and pushed): a later run of the same range starts fresh
+    args.journal.unlink(missing_ok=True)
+
     print(f"\n{'='*60}")
-    print("All hard puzzles regenerated, committed, and pushed successfully!")
+    outcome = "regenerated and committed" if args.no_push else "regenerated, committed, and pushed"
+    print(f"All {label} puzzles {outcome} successfully!")
     print(f"{'='*60}\n")
 
+
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Check the exact solver against the published puzzle corpus.
+
+Every puzzle under public/puzzles stores the optimal distance found when it was
+generated; re-solve each layout the way the generator does (including edge
+elimination for backends that use it) and fail if the distances disagree.
+Time-limited solvers run to completion here rather than handing over to their
+fallback, so each result comes from the solver being checked.
+The batched helpers used for threshold calibration are also checked against
+their per-layout counterparts on the same layouts.
+
+Usage:
+  python generator/verify_solver.py [--solver NAME] [--cross-check NAME] [--limit N]
+
+  --solver NAME       exact solver to check (default: auto, the generator's choice)
+  --cross-check NAME  also re-solve each full layout with this solver
+  --limit N           only check the first N puzzles
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from exact_solvers import EXACT_SOLVERS
+from generate_puzzle import (
+    calculate_distance_matrix,
+    lattice_indices,
+    layout_distance_matrices,
+    route_complexities,
+    route_complexity,
+    solve_tsp_exact,
+)
+from heuristics import nearest_neighbor_tour, nearest_neighbor_tours, tour_length, tour_lengths, two_opt_batch
+
+TOLERANCE = 1e-6
+
+
+def iter_puzzles(root):
+    for path in sorted(root.glob("*/*/*.json")):
+        if path.stem.endswith("_solution"):
+            continue
+        with open(path) as f:
+            yield path, json.load(f)
+
+
+def check_batch_paths(puzzles):
+    """
+    Compare the batched helpers with the per-layout ones on stacks of
+    same-sized lattice layouts; returns (layouts checked, failure messages).
+    two_opt_batch is best-improvement rather than neighbour-list 2-opt, so
+    its tours are only checked to be valid and no longer than nearest-neighbour.
+    """
+    groups = {}
+    for puzzle in puzzles:
+        if lattice_indices(puzzle["north_pole"], puzzle["houses"]) is not None:
+            groups.setdefault((len(puzzle["houses"]), tuple(puzzle["north_pole"].values())), []).append(puzzle)
+
+    failures = []
+    checked = sum(len(group) for group in groups.values())
+    for (num_houses, _), group in sorted(groups.items()):
+        north_pole = group[0]["north_pole"]
+        layouts = np.array([[(h["x"], h["y"]) for h in puzzle["houses"]] for puzzle in group])
+        matrices = layout_distance_matrices(north_pole, layouts)
+        single = np.array([calculate_distance_matrix(north_pole, puzzle["houses"]) for puzzle in group])
+        if not np.array_equal(matrices, single):
+            failures.append(f"{num_houses} houses: layout_distance_matrices differs from calculate_distance_matrix")
+
+        tours = nearest_neighbor_tours(matrices)
+        if not np.array_equal(tours, [nearest_neighbor_tour(m) for m in single]):
+            failures.append(f"{num_houses} houses: nearest_neighbor_tours differs from nearest_neighbor_tour")
+        lengths = tour_lengths(matrices, tours)
+        if not np.array_equal(lengths, [tour_length(m, t) for m, t in zip(single, tours)]):
+            failures.append(f"{num_houses} houses: tour_lengths differs from tour_length")
+
+        improved, improved_lengths = two_opt_batch(matrices, tours)
+        valid = all(t[0] == t[-1] == 0 and sorted(t[:-1]) == list(range(num_houses + 1)) for t in improved.tolist())
+        if not valid or (improved_lengths > lengths + 1e-9).any():
+            failures.append(f"{num_houses} houses: two_opt_batch returned an invalid or longer tour")
+
+        routes = [[(stop["x"], stop["y"]) for stop in puzzle["optimal_route"]] for puzzle in group]
+        if len({len(route) for route in routes}) == 1:
+            if not np.array_equal(route_complexities(np.array(routes)), [route_complexity(r) for r in routes]):
+                failures.append(f"{num_houses} houses: route_complexities differs from route_complexity")
+    return checked, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-solve the puzzle corpus and compare optimal distances.")
+    parser.add_argument(
+        "--solver",
+        choices=["auto", *EXACT_SOLVERS],
+        default="auto",
+        help="exact solver to check (default: auto)",
+    )
+    parser.add_argument("--cross-check", choices=list(EXACT_SOLVERS), help="also re-solve with this solver")
+    parser.add_argument("--limit", type=int, help="only check the first N puzzles")
+    args = parser.parse_args()
+
+    root = Path(__file__).parent.parent / "public" / "puzzles"
+    checked = 0
+    failures = 0
+    solve_time = 0.0
+
+    puzzles = []
+    for path, puzzle in iter_puzzles(root):
+        if args.limit is not None and checked >= args.limit:
+            break
+        puzzles.append(puzzle)
+        name = path.relative_to(root)
+        try:
+            distance, _, _, run = solve_tsp_exact(
+                puzzle["north_pole"],
+                puzzle["houses"],
+                backend=args.solver,
+                cross_check=args.cross_check,
+                fallback=False,
+            )
+        except RuntimeError as exc:
+            failures += 1
+            print(f"MISMATCH {name}: {exc}")
+            checked += 1
+            continue
+        solve_time += run["seconds"]
+        if "fallback_from" in run:
+            failures += 1
+            print(f"FALLBACK {name}: {run['fallback_from']} gave up and {run['solver']} solved it instead")
+            checked += 1
+            continue
+
+        if abs(distance - puzzle["optimal_distance"]) > TOLERANCE:
+            failures += 1
+            print(f"MISMATCH {name}: {run['solver']}={distance:.6f} stored={puzzle['optimal_distance']:.6f}")
+        checked += 1
+
+    print(f"Checked {checked} puzzles in {solve_time:.2f}s solver time, {failures} mismatches.")
+
+    batch_checked, batch_failures = check_batch_paths(puzzles)
+    for message in batch_failures:
+        print(f"BATCH MISMATCH {message}")
+    print(f"Checked batched helpers on {batch_checked} layouts, {len(batch_failures)} mismatches.")
+    failures += len(batch_failures)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()